@@ -0,0 +1,123 @@
+import re
+import threading
+import time
+
+from collections import OrderedDict
+from os import getenv
+
+from exceptions import CircuitOpen, ResponseEmptyHW
+
+ERROR_ALERTS = getenv('ERROR_ALERTS', '1') == '1'
+ERROR_ALERT_TTL = int(getenv('ERROR_ALERT_TTL', 3600))
+ERROR_ALERT_CACHE_SIZE = int(getenv('ERROR_ALERT_CACHE_SIZE', 1024))
+ERROR_ALERT_AFTER = int(getenv('ERROR_ALERT_AFTER', 1))
+ERROR_TEMPLATE = 'Сбой в работе бота: {}: {}'
+REMINDER_TEMPLATE = 'Сбой продолжается: {}: {}. Повторов за {} мин: {}'
+RECOVERY_TEMPLATE = 'Работа бота восстановлена. Сбои за {} мин:'
+RECOVERY_LINE = '{}: {} - {} раз'
+VOLATILE = re.compile(r'0x[0-9a-fA-F]+|\d{5,}')
+
+
+def error_key(tenant_id, error):
+    """Ключ сбоя: студент, класс исключения и текст без адресов и меток."""
+    return (
+        tenant_id, type(error).__name__, VOLATILE.sub('#', str(error))
+    )
+
+
+class Incident:
+    """Повторяющийся сбой одного студента."""
+
+    def __init__(self, error, now):
+        self.name = type(error).__name__
+        self.message = str(error)
+        self.started = now
+        self.sent = None
+        self.count = 0
+        self.suppressed = 0
+
+
+class ErrorNotifier:
+    """Уведомления о сбоях опроса без лавины повторов.
+
+    Сбой определяется студентом, классом исключения и текстом. Сбой
+    отправляется, когда повторился after раз подряд (по умолчанию сразу),
+    дальнейшие повторы только считаются; если сбой длится дольше ttl,
+    уходит одно напоминание за ttl. Первый успешный опрос после
+    отправленных сбоев отправляет сводку. В кэше не больше size сбоев,
+    при переполнении забываются самые давние.
+    """
+
+    def __init__(self, ttl=ERROR_ALERT_TTL, size=ERROR_ALERT_CACHE_SIZE,
+                 after=ERROR_ALERT_AFTER, enabled=ERROR_ALERTS,
+                 ignored=(CircuitOpen, ResponseEmptyHW),
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.size = size
+        self.after = after
+        self.enabled = enabled
+        self.ignored = ignored
+        self.clock = clock
+        self.incidents = OrderedDict()
+        self.tenants = {}
+        self.lock = threading.Lock()
+
+    def on_error(self, tenant_id, error):
+        """Учет сбоя, возвращает текст для отправки или None."""
+        if not self.enabled or isinstance(error, self.ignored):
+            return None
+        key = error_key(tenant_id, error)
+        now = self.clock()
+        with self.lock:
+            incident = self.incidents.get(key)
+            if incident is None:
+                incident = Incident(error, now)
+                self.add(key, incident)
+            incident.count += 1
+            if incident.sent is None:
+                if incident.count < self.after:
+                    return None
+                incident.sent = now
+                return ERROR_TEMPLATE.format(incident.name, incident.message)
+            if now - incident.sent < self.ttl:
+                incident.suppressed += 1
+                return None
+            suppressed = incident.suppressed
+            incident.sent = now
+            incident.suppressed = 0
+        return REMINDER_TEMPLATE.format(
+            incident.name, incident.message,
+            round((now - incident.started) / 60), suppressed
+        )
+
+    def add(self, key, incident):
+        """Запись нового сбоя с вытеснением самого давнего."""
+        self.incidents[key] = incident
+        self.tenants.setdefault(key[0], set()).add(key)
+        while len(self.incidents) > self.size:
+            old_key, _ = self.incidents.popitem(last=False)
+            keys = self.tenants.get(old_key[0])
+            keys.discard(old_key)
+            if not keys:
+                del self.tenants[old_key[0]]
+
+    def on_success(self, tenant_id):
+        """Сводка по сбоям студента после восстановления или None."""
+        if tenant_id not in self.tenants:
+            return None
+        with self.lock:
+            keys = self.tenants.pop(tenant_id, ())
+            incidents = [self.incidents.pop(key) for key in keys]
+        incidents = [
+            incident for incident in incidents if incident.sent is not None
+        ]
+        if not incidents:
+            return None
+        incidents.sort(key=lambda incident: incident.started)
+        minutes = round((self.clock() - incidents[0].started) / 60)
+        return '\n'.join([RECOVERY_TEMPLATE.format(minutes)] + [
+            RECOVERY_LINE.format(
+                incident.name, incident.message, incident.count
+            )
+            for incident in incidents
+        ])
@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import logging
+import re
+import resource
+import sys
+import tempfile
+import time
+
+from os import path
+
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+
+import homework  # noqa: E402
+from benchmarks.stubs import (ReplayPracticum, StubPracticum,  # noqa: E402
+                              StubTelegram)
+from engine import PollingEngine, make_bot  # noqa: E402
+from replay import Recording  # noqa: E402
+from state import StateStore  # noqa: E402
+from tenants import Tenant  # noqa: E402
+
+MESSAGE_PATTERN = re.compile(r'Изменился статус проверки работы "([^"]+)"\. ')
+VERDICTS = {
+    verdict: status for status, verdict in homework.HOMEWORK_STATUSES.items()
+}
+
+
+def percentile(values, share):
+    """Перцентиль отсортированного списка."""
+    if not values:
+        return float('nan')
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def notification_latencies(practicum, telegram):
+    """Задержки от смены статуса до получения сообщения в Telegram."""
+    latencies = []
+    for received, _, text in telegram.messages:
+        for part in text.split('\n\n'):
+            match = MESSAGE_PATTERN.match(part)
+            if not match:
+                continue
+            status = VERDICTS.get(part[match.end():])
+            changed = practicum.changes.get((match.group(1), status))
+            if changed is not None:
+                latencies.append(received - changed)
+    return sorted(latencies)
+
+
+async def run_engine(engine, duration):
+    """Работа движка заданное время."""
+    try:
+        await asyncio.wait_for(engine.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+
+
+def make_practicum(args):
+    """Заглушка API: синтетические студенты или воспроизведение записи."""
+    if args.replay:
+        return ReplayPracticum(Recording.load(args.replay, args.replay_speed))
+    return StubPracticum(
+        [f'token-{index}' for index in range(args.tenants)],
+        homeworks=args.homeworks, changes_per_sec=args.changes_per_sec,
+        latency=args.api_latency, error_rate=args.api_errors, seed=1
+    )
+
+
+def run(args):
+    """Прогон конвейера на заглушках и сбор результатов."""
+    practicum = make_practicum(args).start()
+    tokens = practicum.tokens
+    telegram = StubTelegram(
+        latency=args.telegram_latency, error_rate=args.telegram_errors,
+        seed=2
+    ).start()
+    homework.ENDPOINT = f'{practicum.url}/api/user_api/homework_statuses/'
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = PollingEngine(
+            [Tenant(token, index + 1, token)
+             for index, token in enumerate(tokens)],
+            make_bot('123:stub', base_url=telegram.base_url),
+            concurrency=args.concurrency, retry_time=args.interval,
+            store=StateStore(path.join(directory, 'state.db')),
+            coalesce_window=args.coalesce_window,
+        )
+        started = time.perf_counter()
+        asyncio.run(run_engine(engine, args.duration))
+        elapsed = time.perf_counter() - started
+        finished = time.time()
+
+    practicum.stop()
+    telegram.stop()
+
+    latencies = notification_latencies(practicum, telegram)
+    settled = finished - 2 * args.interval - args.coalesce_window
+    changes = sum(
+        1 for changed in practicum.changes.values() if changed < settled
+    )
+    return {
+        'tenants': len(tokens),
+        'polls_per_sec': practicum.requests / elapsed,
+        'messages': len(telegram.messages),
+        'changes': changes,
+        'notified': len(latencies),
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'max_rss_mb': resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss / 1024,
+    }
+
+
+def parse_args(argv=None):
+    """Параметры прогона."""
+    parser = argparse.ArgumentParser(
+        description='Нагрузочный прогон бота на локальных заглушках API'
+    )
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--interval', type=float, default=2)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--homeworks', type=int, default=5,
+                        help='работ с постоянным статусом в каждом ответе')
+    parser.add_argument('--changes-per-sec', type=float, default=20)
+    parser.add_argument('--api-latency', type=float, default=0.02)
+    parser.add_argument('--api-errors', type=float, default=0.01)
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--telegram-errors', type=float, default=0.0)
+    parser.add_argument('--coalesce-window', type=float, default=0.1)
+    parser.add_argument('--replay', metavar='FILE',
+                        help='ответы API из записи API_RECORD вместо '
+                             'синтетических студентов')
+    parser.add_argument('--replay-speed', type=float, default=1,
+                        help='ускорение записи, 0 - без пауз')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--min-polls-per-sec', type=float, default=0,
+                        help='порог для CI: минимальная скорость опроса')
+    parser.add_argument('--max-p95', type=float, default=0,
+                        help='порог для CI: максимальная p95 задержка, c')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Прогон и проверка порогов."""
+    args = parse_args(argv)
+    logging.getLogger('hw_bot').setLevel(args.log_level)
+    result = run(args)
+    print(
+        f"tenants={result['tenants']} polls/s={result['polls_per_sec']:.1f} "
+        f"messages={result['messages']} "
+        f"notified={result['notified']}/{result['changes']} "
+        f"latency p50={result['p50']:.3f}s p95={result['p95']:.3f}s "
+        f"p99={result['p99']:.3f}s max_rss={result['max_rss_mb']:.1f}MB"
+    )
+    failed = []
+    if result['polls_per_sec'] < args.min_polls_per_sec:
+        failed.append('polls/s')
+    if args.max_p95 and not result['p95'] <= args.max_p95:
+        failed.append('p95')
+    if failed:
+        print(f'Пороги нарушены: {", ".join(failed)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
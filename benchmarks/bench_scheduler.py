@@ -0,0 +1,55 @@
+import random
+import sys
+import time
+
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+from scheduler import DeadlineQueue  # noqa: E402
+
+TENANTS = 100_000
+
+
+def measure(title, func, count):
+    """Замер времени операции и вывод скорости."""
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f'{title:<12} {count:>8} ops {elapsed:8.3f}s '
+          f'{count / elapsed:>12,.0f} ops/s')
+
+
+def main(tenants=TENANTS):
+    """Бенчмарк очереди сроков на tenants студентах."""
+    rng = random.Random(1)
+    queue = DeadlineQueue()
+    keys = [str(index) for index in range(tenants)]
+
+    def insert():
+        for key in keys:
+            queue.schedule(key, rng.uniform(0, 600))
+
+    def reschedule():
+        for key in keys:
+            queue.schedule(key, rng.uniform(0, 600))
+
+    def cancel():
+        for key in keys[::10]:
+            queue.cancel(key)
+
+    def drain():
+        now = 0
+        while queue.next_deadline() is not None:
+            now += 1
+            queue.pop_due(now)
+
+    measure('insert', insert, tenants)
+    measure('reschedule', reschedule, tenants)
+    measure('cancel', cancel, tenants // 10)
+    remaining = len(queue)
+    measure('pop_due', drain, remaining)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else TENANTS)
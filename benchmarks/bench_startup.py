@@ -0,0 +1,117 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.stubs import StubPracticum  # noqa: E402
+
+IMPORT_SCRIPT = (
+    'import time; started = time.perf_counter(); import {module}; '
+    'print(time.perf_counter() - started)'
+)
+MAIN_SCRIPT = (
+    'import sys, homework; homework.ENDPOINT = sys.argv[1]; homework.main()'
+)
+TOKEN = 'startup-token'
+
+
+def measure_import(module, runs):
+    """Медиана времени импорта модуля в новом интерпретаторе."""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SCRIPT.format(module=module)],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout
+        timings.append(float(output.split()[-1]))
+    return statistics.median(timings)
+
+
+def measure_first_poll(runs, timeout=30):
+    """Медиана времени от запуска процесса бота до первого запроса к API."""
+    practicum = StubPracticum([TOKEN], homeworks=0, changes_per_sec=0)
+    practicum.start()
+    url = f'{practicum.url}/api/user_api/homework_statuses/'
+    timings = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(
+                os.environ, PRACTICUM_TOKEN=TOKEN,
+                TELEGRAM_TOKEN='123:startup', TELEGRAM_CHAT_ID='1',
+                STATE_DB=path.join(directory, 'state.db'),
+                METRICS_PORT='', LOG_QUEUE='0', BOT_COMMANDS='0',
+            )
+            for _ in range(runs):
+                seen = practicum.requests
+                started = time.perf_counter()
+                process = subprocess.Popen(
+                    [sys.executable, '-c', MAIN_SCRIPT, url], cwd=ROOT,
+                    env=env, stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                try:
+                    while practicum.requests == seen:
+                        if time.perf_counter() - started > timeout:
+                            raise TimeoutError('Бот не опросил API')
+                        time.sleep(0.001)
+                    timings.append(time.perf_counter() - started)
+                finally:
+                    process.kill()
+                    process.wait()
+    finally:
+        practicum.stop()
+    return statistics.median(timings)
+
+
+def run(args):
+    """Замеры холодного старта."""
+    return {
+        'import_homework': measure_import('homework', args.runs),
+        'import_engine': measure_import('engine', args.runs),
+        'first_poll': measure_first_poll(args.runs),
+    }
+
+
+def parse_args(argv=None):
+    """Параметры прогона."""
+    parser = argparse.ArgumentParser(
+        description='Время импорта и запуска бота до первого опроса'
+    )
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import', type=float, default=0,
+                        help='порог для CI: время импорта homework, c')
+    parser.add_argument('--max-first-poll', type=float, default=0,
+                        help='порог для CI: время до первого опроса, c')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Прогон и проверка бюджета запуска."""
+    args = parse_args(argv)
+    result = run(args)
+    print(
+        f"import homework={result['import_homework']:.3f}s "
+        f"engine={result['import_engine']:.3f}s "
+        f"first_poll={result['first_poll']:.3f}s"
+    )
+    failed = []
+    if args.max_import and result['import_homework'] > args.max_import:
+        failed.append('import')
+    if args.max_first_poll and result['first_poll'] > args.max_first_poll:
+        failed.append('first_poll')
+    if failed:
+        print(f'Пороги нарушены: {", ".join(failed)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
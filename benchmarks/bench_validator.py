@@ -0,0 +1,59 @@
+import logging
+import sys
+import time
+
+from os.path import abspath, dirname
+
+sys.path.append(dirname(dirname(abspath(__file__))))
+
+import homework  # noqa: E402
+
+HOMEWORKS = 50
+ROUNDS = 2000
+
+
+def make_response(count):
+    """Ответ API с count работами и лишними полями."""
+    return {
+        'current_date': 1,
+        'homeworks': [
+            {'id': index, 'homework_name': f'hw{index}',
+             'status': 'approved', 'reviewer_comment': 'Отлично',
+             'lesson_name': 'Итоговый проект',
+             'date_updated': '2022-01-01T00:00:00Z'}
+            for index in range(count)
+        ],
+    }
+
+
+def measure(title, func, count):
+    """Замер времени прохода и вывод скорости."""
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f'{title:<12} {count:>8} ops {elapsed:8.3f}s '
+          f'{count / elapsed:>12,.0f} ops/s')
+
+
+def main(homeworks=HOMEWORKS, rounds=ROUNDS):
+    """Сравнение check_response() + parse_status() с валидатором."""
+    logging.getLogger('hw_bot').setLevel(logging.CRITICAL)
+    response = make_response(homeworks)
+    validator = homework.VALIDATOR
+
+    def chained():
+        for _ in range(rounds):
+            for item in homework.check_response(response):
+                homework.parse_status(item)
+
+    def single_pass():
+        for _ in range(rounds):
+            for record in validator.validate(response):
+                validator.message(record)
+
+    measure('chained', chained, rounds)
+    measure('validator', single_pass, rounds)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
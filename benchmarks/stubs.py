@@ -0,0 +1,246 @@
+import json
+import random
+import sys
+import threading
+import time
+
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class StubServer(ThreadingHTTPServer):
+    """Локальный HTTP-сервер заглушки в фоновом потоке."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0, seed=None):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        """Адрес сервера."""
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def start(self):
+        """Запуск в фоновом потоке."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Остановка сервера."""
+        self.shutdown()
+        self.server_close()
+
+    def handle_error(self, request, client_address):
+        """Обрыв соединения клиентом не считается ошибкой заглушки."""
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def begin_request(self):
+        """Учет запроса, задержка и решение об ошибке."""
+        with self.lock:
+            self.requests += 1
+            failed = self.rng.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        return failed
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class PracticumHandler(StubHandler):
+
+    def do_GET(self):
+        server = self.server
+        if server.begin_request():
+            self.send_json(500, {'message': 'Internal Server Error'})
+            return
+        token = self.headers.get('Authorization', '').split(' ')[-1]
+        query = parse_qs(urlparse(self.path).query)
+        from_date = int(query.get('from_date', ['0'])[0])
+        self.send_json(200, {
+            'homeworks': server.homeworks(token, from_date),
+            'current_date': int(time.time()),
+        })
+
+
+class StubPracticum(StubServer):
+    """Заглушка API Практикума.
+
+    У каждого токена есть homeworks работ с постоянным статусом и одна
+    активная работа, статус которой меняет фоновый ревьюер с частотой
+    changes_per_sec на весь сервер. Время каждого изменения
+    запоминается для расчета задержки уведомлений.
+    """
+
+    def __init__(self, tokens, homeworks=1, changes_per_sec=10.0, **kwargs):
+        super().__init__(PracticumHandler, **kwargs)
+        self.tokens = list(tokens)
+        self.padding = {
+            token: [
+                {'id': f'{token}-static-{index}',
+                 'homework_name': f'{token}-static-{index}',
+                 'status': 'approved', 'date_updated': 0}
+                for index in range(homeworks)
+            ]
+            for token in self.tokens
+        }
+        self.active = {
+            token: {'id': f'{token}-active',
+                    'homework_name': f'{token}-active',
+                    'status': 'reviewing', 'date_updated': time.time()}
+            for token in self.tokens
+        }
+        self.changes_per_sec = changes_per_sec
+        self.changes = {}
+        self.stopped = threading.Event()
+
+    def homeworks(self, token, from_date):
+        """Работы студента для ответа.
+
+        Активная работа попадает в ответ, если изменилась не раньше
+        from_date, работы с постоянным статусом - всегда, как балласт
+        для проверки больших ответов.
+        """
+        with self.lock:
+            active = dict(self.active.get(token) or {})
+        result = []
+        if active and active['date_updated'] >= from_date:
+            result.append(active)
+        result.extend(self.padding.get(token, ()))
+        return [
+            dict(homework, date_updated=iso(homework['date_updated']))
+            for homework in result
+        ]
+
+    def review(self):
+        """Фоновая смена статусов."""
+        delay = 1 / self.changes_per_sec
+        while not self.stopped.wait(delay):
+            token = self.rng.choice(self.tokens)
+            with self.lock:
+                homework = self.active[token]
+                status = STATUSES[
+                    (STATUSES.index(homework['status']) + 1) % len(STATUSES)
+                ]
+                now = time.time()
+                homework['status'] = status
+                homework['date_updated'] = now
+                self.changes[(homework['homework_name'], status)] = now
+
+    def start(self):
+        super().start()
+        if self.changes_per_sec:
+            threading.Thread(target=self.review, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        super().stop()
+
+
+class ReplayHandler(StubHandler):
+
+    def do_GET(self):
+        server = self.server
+        server.begin_request()
+        token = self.headers.get('Authorization', '').split(' ')[-1]
+        entry = server.recording.entry(token)
+        if entry is None:
+            self.send_json(401, {'code': 'not_authenticated'})
+            return
+        time.sleep(server.recording.latency(entry))
+        body = entry['body'].encode()
+        self.send_response(entry['status'])
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReplayPracticum(StubServer):
+    """Заглушка API Практикума, отвечающая записанными ответами.
+
+    Токенами служат ключи студентов из записи, задержка и смены
+    статусов воспроизводятся по replay.Recording.
+    """
+
+    def __init__(self, recording, **kwargs):
+        super().__init__(ReplayHandler, **kwargs)
+        self.recording = recording
+        self.tokens = sorted(recording.tenants)
+        self.changes = {}
+
+
+class TelegramHandler(StubHandler):
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        data = json.loads(self.rfile.read(length) or b'{}')
+        if server.begin_request():
+            self.send_json(429, {
+                'ok': False, 'error_code': 429,
+                'description': 'Too Many Requests: retry after 1',
+                'parameters': {'retry_after': 1},
+            })
+            return
+        server.receive(data.get('chat_id'), data.get('text', ''))
+        self.send_json(200, {'ok': True, 'result': {
+            'message_id': server.requests,
+            'date': int(time.time()),
+            'chat': {'id': data.get('chat_id'), 'type': 'private'},
+            'text': data.get('text'),
+        }})
+
+
+class StubTelegram(StubServer):
+    """Заглушка Bot API: принимает sendMessage и запоминает сообщения.
+
+    С вероятностью error_rate отвечает 429 с retry_after.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(TelegramHandler, **kwargs)
+        self.messages = []
+
+    @property
+    def base_url(self):
+        """Адрес для telegram.Bot(base_url=...)."""
+        return f'{self.url}/bot'
+
+    def receive(self, chat_id, text):
+        """Запоминание полученного сообщения."""
+        with self.lock:
+            self.messages.append((time.time(), chat_id, text))
+
+
+def iso(timestamp):
+    """Время в формате API Практикума."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
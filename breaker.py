@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+
+from http import HTTPStatus
+from os import getenv
+
+from exceptions import CircuitOpen
+
+logger = logging.getLogger('hw_bot')
+
+BREAKER_THRESHOLD = int(getenv('BREAKER_THRESHOLD', 5))
+BREAKER_RESET_TIMEOUT = float(getenv('BREAKER_RESET_TIMEOUT', 30))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Предохранитель для одного адреса API.
+
+    После threshold ошибок подряд запросы отклоняются исключением
+    CircuitOpen. Через reset_timeout пропускается один пробный запрос:
+    успех закрывает предохранитель, ошибка снова открывает его.
+    """
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.probing = False
+
+    def before_call(self):
+        """Проверка, можно ли выполнить запрос."""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            if (self.state == OPEN
+                    and self.clock() - self.opened >= self.reset_timeout):
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                logger.info('Пробный запрос к %s', self.name)
+                return
+        raise CircuitOpen(f'API {self.name} временно недоступно')
+
+    def on_success(self):
+        """Учет успешного запроса."""
+        with self.lock:
+            if self.state != CLOSED:
+                logger.info('API %s снова доступно', self.name)
+            self.state = CLOSED
+            self.failures = 0
+            self.probing = False
+
+    def on_failure(self):
+        """Учет неудачного запроса."""
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                if self.state != OPEN:
+                    logger.error(
+                        'API %s недоступно, запросы приостановлены на %s c',
+                        self.name, self.reset_timeout
+                    )
+                self.state = OPEN
+                self.opened = self.clock()
+                self.probing = False
+
+
+class GuardedClient:
+    """Клиент, пропускающий запросы через предохранитель адреса.
+
+    Ошибкой считаются только сбои запроса и ответы 5xx: ответы 4xx
+    относятся к конкретному студенту и не говорят о недоступности API.
+    """
+
+    def __init__(self, client, threshold=BREAKER_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.client = client
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.breakers = {}
+
+    def get_breaker(self, url):
+        """Предохранитель для адреса, общий для всех студентов."""
+        breaker = self.breakers.get(url)
+        if breaker is None:
+            breaker = self.breakers.setdefault(url, CircuitBreaker(
+                url, self.threshold, self.reset_timeout
+            ))
+        return breaker
+
+    def get(self, url, **kwargs):
+        """GET-запрос с проверкой предохранителя."""
+        breaker = self.get_breaker(url)
+        breaker.before_call()
+        try:
+            response = self.client.get(url, **kwargs)
+        except Exception:
+            breaker.on_failure()
+            raise
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            breaker.on_failure()
+        else:
+            breaker.on_success()
+        return response
+
+    def close(self):
+        """Закрытие клиента."""
+        self.client.close()
@@ -0,0 +1,210 @@
+import logging
+import threading
+import time
+
+from os import getenv
+
+import homework
+from exceptions import ResponseEmptyHW
+from state import homework_key
+
+logger = logging.getLogger('hw_bot')
+
+BOT_COMMANDS = getenv('BOT_COMMANDS', '1') == '1'
+STATUS_TTL = int(getenv('STATUS_TTL', 300))
+REFRESH_MIN_AGE = int(getenv('REFRESH_MIN_AGE', 30))
+COMMAND_WORKERS = int(getenv('COMMAND_WORKERS', 4))
+STATUS_TEMPLATE = '"{}": {}'
+
+
+def fetch_statuses(headers, client=None):
+    """Все текущие работы студента, без учета метки последнего опроса."""
+    try:
+        return homework.validate_response(
+            homework.request_api(headers, 0, client)
+        )
+    except ResponseEmptyHW:
+        return []
+
+
+class Flight:
+    """Запрос к API, результат которого ждут все одновременные вызовы."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class StatusCache:
+    """Последние известные статусы работ по студентам.
+
+    Записи живут ttl секунд. Устаревшая или отсутствующая запись
+    обновляется через fetch(tenant_id), причем одновременные обновления
+    одного студента сливаются в один запрос к API. Опросы дополняют
+    запись изменившимися работами через update().
+    known(tenant_id) - статусы, о которых бот уже уведомил; если
+    запрос к API вернул другие, студент отмечается для take_changed().
+    """
+
+    def __init__(self, fetch, ttl=STATUS_TTL, clock=time.monotonic,
+                 known=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.clock = clock
+        self.known = known
+        self.entries = {}
+        self.flights = {}
+        self.changed = set()
+        self.lock = threading.Lock()
+
+    def update(self, tenant_id, records):
+        """Дополнение записи работами из очередного опроса."""
+        with self.lock:
+            entry = self.entries.get(tenant_id)
+            if entry is not None:
+                entry[1].update(
+                    (homework_key(record), record) for record in records
+                )
+
+    def forget(self, tenant_id):
+        """Удаление записи студента, следующий get() запросит API."""
+        with self.lock:
+            self.entries.pop(tenant_id, None)
+            self.changed.discard(tenant_id)
+
+    def take_changed(self, tenant_id):
+        """True один раз после запроса, нашедшего новые статусы."""
+        with self.lock:
+            if tenant_id not in self.changed:
+                return False
+            self.changed.discard(tenant_id)
+            return True
+
+    def is_changed(self, tenant_id, records):
+        """Отличаются ли статусы от тех, о которых бот уже уведомил."""
+        if self.known is None:
+            return True
+        known = self.known(tenant_id)
+        return any(
+            known.get(homework_key(record)) != record.get('status')
+            for record in records
+        )
+
+    def get(self, tenant_id, max_age=None):
+        """Статусы студента не старше max_age секунд, по умолчанию ttl."""
+        max_age = self.ttl if max_age is None else max_age
+        with self.lock:
+            entry = self.entries.get(tenant_id)
+            if entry is not None and self.clock() - entry[0] < max_age:
+                return list(entry[1].values())
+        return self.refresh(tenant_id)
+
+    def refresh(self, tenant_id):
+        """Запрос статусов, общий для всех одновременных вызовов."""
+        with self.lock:
+            flight = self.flights.get(tenant_id)
+            leader = flight is None
+            if leader:
+                flight = self.flights[tenant_id] = Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            records = self.fetch(tenant_id)
+        except Exception as error:
+            flight.error = error
+            raise
+        else:
+            flight.result = list(records)
+            changed = self.is_changed(tenant_id, flight.result)
+            with self.lock:
+                self.entries[tenant_id] = (self.clock(), {
+                    homework_key(record): record for record in records
+                })
+                if changed:
+                    self.changed.add(tenant_id)
+            return flight.result
+        finally:
+            with self.lock:
+                del self.flights[tenant_id]
+            flight.done.set()
+
+
+def format_statuses(records):
+    """Текст ответа на /status."""
+    if not records:
+        return 'Работ на проверке пока нет'
+    return '\n'.join(
+        STATUS_TEMPLATE.format(
+            record['homework_name'],
+            homework.HOMEWORK_STATUSES[record['status']]
+        )
+        for record in records
+    )
+
+
+class StatusCommands:
+    """Команды /status и /refresh для подключенных чатов.
+
+    chats - соответствие чата Telegram студенту. /status отвечает из
+    кэша, /refresh запрашивает API, только если данным больше
+    REFRESH_MIN_AGE секунд. Если запрос нашел статусы, о которых бот
+    еще не уведомил, вызывается on_refresh(tenant_id), чтобы опрос
+    студента выполнился сразу; серия команд вызывает его не больше
+    одного раза на запрос к API.
+    """
+
+    def __init__(self, cache, chats, refresh_min_age=REFRESH_MIN_AGE,
+                 on_refresh=None):
+        self.cache = cache
+        self.chats = {str(chat_id): tenant for chat_id, tenant in chats}
+        self.refresh_min_age = refresh_min_age
+        self.on_refresh = on_refresh
+
+    def status(self, update, context):
+        """Ответ на /status."""
+        self.reply(update, None)
+
+    def refresh(self, update, context):
+        """Ответ на /refresh и внеочередной опрос."""
+        tenant_id = self.reply(update, self.refresh_min_age)
+        if (tenant_id is not None and self.on_refresh is not None
+                and self.cache.take_changed(tenant_id)):
+            self.on_refresh(tenant_id)
+
+    def reply(self, update, max_age):
+        """Ответ статусами работ студента, которому принадлежит чат.
+
+        Возвращает студента или None для неподключенного чата.
+        """
+        tenant_id = self.chats.get(str(update.effective_chat.id))
+        if tenant_id is None:
+            update.effective_message.reply_text('Чат не подключен к боту')
+            return None
+        try:
+            text = format_statuses(self.cache.get(tenant_id, max_age))
+        except Exception as error:
+            logger.error('Статусы [%s] не получены: %s', tenant_id, error)
+            text = 'Не удалось получить статусы, попробуйте позже'
+        update.effective_message.reply_text(text)
+        return tenant_id
+
+
+def start_commands(bot, commands, workers=COMMAND_WORKERS):
+    """Запуск приема команд через long polling в фоновых потоках."""
+    from telegram.ext import CommandHandler, Updater
+
+    updater = Updater(bot=bot, workers=workers, use_context=True)
+    updater.dispatcher.add_handler(
+        CommandHandler('status', commands.status, run_async=True)
+    )
+    updater.dispatcher.add_handler(
+        CommandHandler('refresh', commands.refresh, run_async=True)
+    )
+    updater.start_polling(drop_pending_updates=True)
+    logger.info('Команды бота запущены')
+    return updater
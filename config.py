@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import threading
+
+from os import getenv
+
+from dotenv import dotenv_values, find_dotenv
+
+import homework
+from tenants import Tenant, load_tenants
+from validator import ResponseValidator
+
+logger = logging.getLogger('hw_bot')
+
+CONFIG_FILE = getenv('CONFIG_FILE')
+CONFIG_WATCH_INTERVAL = float(getenv('CONFIG_WATCH_INTERVAL', 5))
+DEFAULT_RETRY_TIME = homework.RETRY_TIME
+DEFAULT_STATUSES = dict(homework.HOMEWORK_STATUSES)
+
+
+class Config:
+    """Снимок настроек, которые можно менять без перезапуска."""
+
+    def __init__(self, telegram_token, practicum_token, chat_id, retry_time,
+                 statuses, tenants):
+        self.telegram_token = telegram_token
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.retry_time = retry_time
+        self.statuses = statuses
+        self.tenants = tenants
+
+
+def read_env():
+    """Окружение процесса, дополненное текущим содержимым .env.
+
+    Как и при запуске, переменные процесса важнее .env: из файла
+    берутся только переменные, которых не было в окружении до
+    load_dotenv(), поэтому их правки в .env подхватываются.
+    """
+    env = dict(os.environ)
+    path = find_dotenv()
+    if path:
+        env.update(
+            (key, value) for key, value in dotenv_values(path).items()
+            if value is not None and key not in homework.PROCESS_ENV_KEYS
+        )
+    return env
+
+
+def read_overrides(config_file):
+    """Настройки из JSON-файла CONFIG_FILE: retry_time, homework_statuses."""
+    if not config_file:
+        return {}
+    with open(config_file, encoding='utf-8') as file:
+        overrides = json.load(file)
+    if not isinstance(overrides, dict):
+        raise TypeError(f'В файле {config_file} ожидается объект настроек')
+    statuses = overrides.get('homework_statuses')
+    if statuses is not None and (
+        not isinstance(statuses, dict) or not statuses
+        or not all(isinstance(text, str) for text in statuses.values())
+    ):
+        raise TypeError('homework_statuses должен быть словарем текстов')
+    return overrides
+
+
+def read_config(env=None, config_file=CONFIG_FILE):
+    """Чтение текущих настроек из окружения, .env и файлов."""
+    env = read_env() if env is None else env
+    overrides = read_overrides(config_file)
+    retry_time = int(overrides.get(
+        'retry_time', env.get('RETRY_TIME', DEFAULT_RETRY_TIME)
+    ))
+    if retry_time <= 0:
+        raise ValueError(f'Неверный интервал опроса: {retry_time}')
+
+    tenants_file = env.get('TENANTS_FILE')
+    if tenants_file:
+        tenants = load_tenants(tenants_file)
+    elif env.get('PRACTICUM_TOKEN') and env.get('TELEGRAM_CHAT_ID'):
+        tenants = [Tenant(env['PRACTICUM_TOKEN'], env['TELEGRAM_CHAT_ID'])]
+    else:
+        tenants = []
+
+    return Config(
+        env.get('TELEGRAM_TOKEN'), env.get('PRACTICUM_TOKEN'),
+        env.get('TELEGRAM_CHAT_ID'), retry_time,
+        dict(overrides.get('homework_statuses', DEFAULT_STATUSES)), tenants
+    )
+
+
+def watched_files(env=None, config_file=CONFIG_FILE):
+    """Файлы, при изменении которых настройки перечитываются."""
+    env = os.environ if env is None else env
+    return [
+        path for path in (config_file, env.get('TENANTS_FILE'), find_dotenv())
+        if path
+    ]
+
+
+def diff_tenants(old, new):
+    """Студенты, у которых сменился токен или чат."""
+    return [
+        tenant_id for tenant_id, tenant in new.items()
+        if tenant_id in old and (
+            old[tenant_id].practicum_token != tenant.practicum_token
+            or str(old[tenant_id].chat_id) != str(tenant.chat_id)
+        )
+    ]
+
+
+def apply_globals(config):
+    """Перенос настроек в глобальные переменные homework.
+
+    Статусы и токен Практикума заменяются целиком, а не изменяются
+    на месте, чтобы параллельные опросы видели либо старые, либо новые
+    значения. Возвращает названия изменившихся настроек.
+    """
+    changed = []
+    if config.statuses != homework.HOMEWORK_STATUSES:
+        homework.HOMEWORK_STATUSES = dict(config.statuses)
+        homework.VALIDATOR = ResponseValidator(config.statuses)
+        changed.append('HOMEWORK_STATUSES')
+    if config.retry_time != homework.RETRY_TIME:
+        homework.RETRY_TIME = config.retry_time
+        changed.append('RETRY_TIME')
+    if config.practicum_token != homework.PRACTICUM_TOKEN:
+        homework.PRACTICUM_TOKEN = config.practicum_token
+        homework.HEADERS = {
+            'Authorization': f'OAuth {config.practicum_token}'
+        }
+        changed.append('PRACTICUM_TOKEN')
+    return changed
+
+
+class ConfigWatcher:
+    """Слежение за файлами настроек по времени изменения.
+
+    Раз в interval секунд сверяет время изменения файлов и вызывает
+    on_change(), если какой-то из них изменился, появился или исчез.
+    """
+
+    def __init__(self, on_change, paths=None, interval=CONFIG_WATCH_INTERVAL):
+        self.on_change = on_change
+        self.paths = watched_files() if paths is None else paths
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.last = self.snapshot()
+
+    def snapshot(self):
+        """Время изменения каждого файла, None для отсутствующих."""
+        result = {}
+        for path in self.paths:
+            try:
+                result[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                result[path] = None
+        return result
+
+    def check(self):
+        """True, если файлы изменились с прошлой проверки."""
+        current = self.snapshot()
+        changed = current != self.last
+        self.last = current
+        return changed
+
+    def start(self):
+        """Слежение в фоновом потоке, если есть за чем следить."""
+        if not self.paths or self.interval <= 0:
+            return None
+
+        def watch():
+            while not self.stopped.wait(self.interval):
+                if self.check():
+                    logger.info('Файлы настроек изменились')
+                    self.on_change()
+
+        thread = threading.Thread(target=watch, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Остановка слежения."""
+        self.stopped.set()
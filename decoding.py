@@ -0,0 +1,126 @@
+import codecs
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_SIZE = 64 * 1024
+HOMEWORK_FIELDS = ('id', 'homework_name', 'status', 'date_updated')
+
+_decoder = json.JSONDecoder()
+
+
+def loads(data):
+    """Разбор JSON через orjson, если он установлен."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def response_json(response):
+    """Разбор тела ответа быстрым декодером.
+
+    Объекты без атрибута content разбираются их собственным json().
+    """
+    content = getattr(response, 'content', None)
+    if not isinstance(content, (bytes, str)):
+        return response.json()
+    return loads(content)
+
+
+def project(homework):
+    """Компактная запись работы только с нужными боту полями."""
+    if not isinstance(homework, dict):
+        return homework
+    return {
+        field: homework[field] for field in HOMEWORK_FIELDS
+        if field in homework
+    }
+
+
+class HomeworkStream:
+    """Потоковый разбор ответа API по частям.
+
+    Итерация выдает работы из массива homeworks по одной, не собирая
+    весь ответ в память. После окончания итерации в envelope лежат
+    остальные поля ответа, например current_date, а homeworks в нем -
+    пустой список.
+    """
+
+    def __init__(self, chunks, key='homeworks'):
+        self.chunks = iter(chunks)
+        self.key = key
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.envelope = None
+
+    def read(self):
+        """Догрузка следующей части в буфер."""
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                chunk = self.text_decoder.decode(chunk)
+            if chunk:
+                self.buffer += chunk
+                return True
+        return False
+
+    def find_array(self):
+        """Позиция открывающей скобки массива работ."""
+        marker = f'"{self.key}"'
+        position = 0
+        while True:
+            index = self.buffer.find(marker, position)
+            if index >= 0:
+                colon = self.buffer.find(':', index + len(marker))
+                bracket = self.buffer.find('[', colon + 1)
+                if colon >= 0 and bracket >= 0:
+                    return bracket
+            position = max(len(self.buffer) - len(marker) - 64, 0)
+            if not self.read():
+                raise ValueError(f'В ответе нет массива {self.key}')
+
+    def skip(self, position, characters):
+        """Пропуск символов с догрузкой буфера."""
+        while True:
+            while (position < len(self.buffer)
+                   and self.buffer[position] in characters):
+                position += 1
+            if position < len(self.buffer) or not self.read():
+                return position
+
+    def __iter__(self):
+        start = self.find_array()
+        prefix = self.buffer[:start]
+        position = start + 1
+        while True:
+            position = self.skip(position, ' \t\r\n,')
+            if position >= len(self.buffer):
+                raise ValueError('Ответ оборвался внутри массива')
+            if self.buffer[position] == ']':
+                break
+            try:
+                item, position = _decoder.raw_decode(self.buffer, position)
+            except json.JSONDecodeError:
+                if not self.read():
+                    raise
+                continue
+            yield item
+            if position > CHUNK_SIZE:
+                self.buffer = self.buffer[position:]
+                position = 0
+
+        self.buffer = self.buffer[position + 1:]
+        while self.read():
+            pass
+        self.envelope = json.loads(prefix + '[]' + self.buffer)
+
+
+def read_stream(response):
+    """Потоковый разбор ответа requests в компактные записи работ."""
+    stream = HomeworkStream(response.iter_content(CHUNK_SIZE))
+    homeworks = [project(homework) for homework in stream]
+    envelope = stream.envelope
+    envelope['homeworks'] = homeworks
+    return envelope
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+
+logger = logging.getLogger('hw_bot')
+
+DELIVERY_WORKERS = int(getenv('DELIVERY_WORKERS', 4))
+TELEGRAM_GLOBAL_RATE = float(getenv('TELEGRAM_GLOBAL_RATE', 25))
+TELEGRAM_CHAT_RATE = float(getenv('TELEGRAM_CHAT_RATE', 1))
+COALESCE_WINDOW = float(getenv('COALESCE_WINDOW', 30))
+TELEGRAM_MESSAGE_LIMIT = 4096
+DELIVERY_ATTEMPTS = 5
+DELIVERY_MAX_BACKOFF = 60
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate токенов в секунду, запас capacity.
+
+    reserve() сразу забирает токен и возвращает, сколько секунд нужно
+    подождать перед его использованием. Баланс может уходить в минус,
+    поэтому резервирования обслуживаются в порядке очереди.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def refill(self):
+        """Пополнение баланса за прошедшее время."""
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def reserve(self):
+        """Резервирование токена, возвращает время ожидания."""
+        self.refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    def pause(self, seconds):
+        """Запрет отправки на seconds секунд, например после 429."""
+        self.refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class Coalescer:
+    """Объединение уведомлений одного чата в одно сообщение.
+
+    Первое уведомление чата открывает окно в window секунд, все
+    уведомления, пришедшие за это время, уходят одним сообщением.
+    Новый статус работы заменяет еще не отправленный старый.
+    """
+
+    def __init__(self, put, window=COALESCE_WINDOW,
+                 limit=TELEGRAM_MESSAGE_LIMIT):
+        self.put = put
+        self.window = window
+        self.limit = limit
+        self.pending = {}
+        self.timers = {}
+
+    def add(self, chat_id, key, text, message_key=None):
+        """Добавление уведомления о работе key в окно чата.
+
+        message_key - ключ уведомления в outbox, ключи замененных
+        уведомлений передаются вместе с итоговым сообщением.
+        """
+        notifications = self.pending.setdefault(chat_id, {})
+        _, keys = notifications.pop(key, (None, []))
+        if message_key is not None:
+            keys.append(message_key)
+        notifications[key] = (text, keys)
+        if chat_id not in self.timers:
+            loop = asyncio.get_running_loop()
+            self.timers[chat_id] = loop.call_later(
+                self.window, self.flush, chat_id
+            )
+
+    def flush(self, chat_id):
+        """Отправка накопленных уведомлений чата."""
+        timer = self.timers.pop(chat_id, None)
+        if timer is not None:
+            timer.cancel()
+        notifications = self.pending.pop(chat_id, None)
+        if not notifications:
+            return
+        if len(notifications) > 1:
+            logger.info(
+                'Объединено уведомлений для чата %s: %s',
+                chat_id, len(notifications)
+            )
+        for text, keys in self.merge(notifications.values()):
+            self.put(chat_id, text, keys)
+
+    def flush_all(self):
+        """Отправка всех накопленных уведомлений."""
+        for chat_id in list(self.pending):
+            self.flush(chat_id)
+
+    def drop(self, chat_ids):
+        """Отмена накопленных уведомлений чатов без отправки.
+
+        Возвращает ключи outbox отмененных уведомлений.
+        """
+        dropped = []
+        for chat_id in chat_ids:
+            timer = self.timers.pop(chat_id, None)
+            if timer is not None:
+                timer.cancel()
+            for _, keys in self.pending.pop(chat_id, {}).values():
+                dropped.extend(keys)
+        return dropped
+
+    def merge(self, notifications):
+        """Склейка текстов в сообщения не длиннее лимита Telegram.
+
+        notifications - пары (текст, ключи), возвращаются такие же пары.
+        """
+        messages = []
+        current = ''
+        current_keys = []
+        for text, keys in notifications:
+            if current and len(current) + 2 + len(text) > self.limit:
+                messages.append((current, current_keys))
+                current = ''
+                current_keys = []
+            current = f'{current}\n\n{text}' if current else text
+            current_keys.extend(keys)
+        if current:
+            messages.append((current, current_keys))
+        return messages
+
+    def qsize(self):
+        """Количество уведомлений, ожидающих окончания окна."""
+        return sum(len(pending) for pending in self.pending.values())
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений Telegram с отдельными исполнителями.
+
+    Сообщения одного чата всегда попадают к одному исполнителю, что
+    сохраняет их порядок. Частота ограничивается общим и поштучным для
+    каждого чата TokenBucket, ответ 429 с retry_after приостанавливает
+    отправку для всех чатов. После отправки или отказа от нее ключи
+    сообщения передаются в on_delivered или on_failed.
+    """
+
+    def __init__(self, send, workers=DELIVERY_WORKERS,
+                 global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate=TELEGRAM_CHAT_RATE,
+                 attempts=DELIVERY_ATTEMPTS,
+                 on_delivered=None, on_failed=None):
+        self.send = send
+        self.on_delivered = on_delivered
+        self.on_failed = on_failed
+        self.workers = workers
+        self.chat_rate = chat_rate
+        self.attempts = attempts
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_buckets = {}
+        self.queues = None
+        self.sending = {}
+        self.idle = None
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def get_queues(self):
+        """Очереди исполнителей, создаются внутри цикла событий."""
+        if self.queues is None:
+            self.queues = [asyncio.Queue() for _ in range(self.workers)]
+            self.idle = asyncio.Event()
+        return self.queues
+
+    def put(self, chat_id, text, keys=()):
+        """Постановка сообщения в очередь без ожидания отправки."""
+        queues = self.get_queues()
+        queues[hash(str(chat_id)) % len(queues)].put_nowait(
+            (chat_id, text, keys)
+        )
+
+    def qsize(self):
+        """Количество сообщений, ожидающих отправки."""
+        return sum(queue.qsize() for queue in self.queues or ())
+
+    def drop(self, chat_ids):
+        """Удаление из очереди сообщений чатов без отправки.
+
+        Сообщения, которые уже отправляются, не трогаются, их можно
+        дождаться через settle(). Возвращает ключи удаленных сообщений.
+        """
+        chat_ids = {str(chat_id) for chat_id in chat_ids}
+        dropped = []
+        for queue in self.queues or ():
+            kept = []
+            while not queue.empty():
+                message = queue.get_nowait()
+                queue.task_done()
+                if str(message[0]) in chat_ids:
+                    dropped.extend(message[2])
+                else:
+                    kept.append(message)
+            for message in kept:
+                queue.put_nowait(message)
+        return dropped
+
+    async def settle(self, chat_ids):
+        """Ожидание окончания начатых отправок в чаты."""
+        chat_ids = {str(chat_id) for chat_id in chat_ids}
+        while chat_ids.intersection(self.sending):
+            self.idle.clear()
+            await self.idle.wait()
+
+    async def join(self):
+        """Ожидание отправки всех сообщений из очереди."""
+        for queue in self.get_queues():
+            await queue.join()
+
+    async def acquire(self, chat_id):
+        """Ожидание разрешения на отправку в чат."""
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate)
+        await asyncio.sleep(bucket.reserve())
+        await asyncio.sleep(self.global_bucket.reserve())
+
+    async def deliver(self, chat_id, text):
+        """Отправка одного сообщения с повторами."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(1, self.attempts + 1):
+            await self.acquire(chat_id)
+            try:
+                await loop.run_in_executor(
+                    self.executor, self.send, chat_id, text
+                )
+                return True
+            except Exception as error:
+                retry_after = getattr(error, 'retry_after', None)
+                if retry_after is not None:
+                    logger.warning(
+                        'Telegram просит подождать %s c', retry_after
+                    )
+                    self.global_bucket.pause(retry_after)
+                    continue
+                logger.error(
+                    'Сообщение в чат %s не отправлено (попытка %s): %s',
+                    chat_id, attempt, error
+                )
+                await asyncio.sleep(min(2 ** attempt, DELIVERY_MAX_BACKOFF))
+        logger.error('Сообщение в чат %s отброшено', chat_id)
+        return False
+
+    async def worker(self, queue):
+        """Исполнитель, отправляющий сообщения своей очереди."""
+        while True:
+            chat_id, text, keys = await queue.get()
+            chat = str(chat_id)
+            self.sending[chat] = self.sending.get(chat, 0) + 1
+            try:
+                delivered = await self.deliver(chat_id, text)
+                callback = self.on_delivered if delivered else self.on_failed
+                if callback is not None:
+                    callback(keys)
+            finally:
+                self.sending[chat] -= 1
+                if not self.sending[chat]:
+                    del self.sending[chat]
+                self.idle.set()
+                queue.task_done()
+
+    async def run(self):
+        """Запуск всех исполнителей."""
+        try:
+            await asyncio.gather(*(
+                self.worker(queue) for queue in self.get_queues()
+            ))
+        finally:
+            self.executor.shutdown(wait=False)
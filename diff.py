@@ -0,0 +1,31 @@
+from state import homework_key
+
+
+def index_homeworks(homeworks):
+    """Индекс работ ответа по ключу за один проход.
+
+    Если работа встречается в ответе несколько раз, остается запись
+    с наибольшим date_updated.
+    """
+    index = {}
+    for homework in homeworks:
+        key = homework_key(homework)
+        previous = index.get(key)
+        if previous is None or (
+            homework.get('date_updated', '')
+            > previous.get('date_updated', '')
+        ):
+            index[key] = homework
+    return index
+
+
+def diff_homeworks(homeworks, known_statuses):
+    """Работы, статус которых отличается от последнего известного.
+
+    known_statuses - словарь {ключ работы: статус}.
+    """
+    return [
+        homework
+        for key, homework in index_homeworks(homeworks).items()
+        if known_statuses.get(key) != homework.get('status')
+    ]
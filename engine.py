@@ -0,0 +1,561 @@
+import asyncio
+import logging
+import signal
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from os import getenv
+
+import homework
+from alerts import ErrorNotifier
+from commands import (BOT_COMMANDS, COMMAND_WORKERS, StatusCache,
+                      StatusCommands, fetch_statuses, start_commands)
+from config import ConfigWatcher, apply_globals, diff_tenants, read_config
+from delivery import (COALESCE_WINDOW, DELIVERY_WORKERS, Coalescer,
+                      DeliveryQueue)
+from exceptions import CircuitOpen, ResponseEmptyHW, TokenMissing
+from http_client import HTTP_POOL_SIZE
+from lease import Lease
+from logs import setup_logging
+from metrics import POLL_LAG, QUEUE_DEPTH, start_server
+from outbox import Outbox
+from scheduler import AdaptiveScheduler, DeadlineQueue
+from state import StateStore
+from tenants import Tenant, load_tenants
+
+logger = logging.getLogger('hw_bot')
+
+TENANTS_FILE = getenv('TENANTS_FILE')
+POLL_CONCURRENCY = int(getenv('POLL_CONCURRENCY', 64))
+STATE_FLUSH_INTERVAL = int(getenv('STATE_FLUSH_INTERVAL', 5))
+OUTBOX_RETRY_INTERVAL = int(getenv('OUTBOX_RETRY_INTERVAL', 60))
+STREAM_WINDOW = int(getenv('STREAM_WINDOW', 7 * 24 * 3600))
+ENGINE_LEASE = getenv('ENGINE_LEASE', 'engine')
+API_MIN_TIMEOUT = float(getenv('API_MIN_TIMEOUT', 1))
+
+
+class PollingEngine:
+    """Асинхронный опрос API домашки для множества студентов.
+
+    Сроки следующих опросов хранятся в одной очереди DeadlineQueue,
+    один диспетчер запускает опросы по мере наступления сроков.
+    """
+
+    def __init__(self, tenants, bot, concurrency=POLL_CONCURRENCY,
+                 retry_time=homework.RETRY_TIME, client=None, store=None,
+                 coalesce_window=COALESCE_WINDOW, outbox=None,
+                 commands=False, lease=None, watch=False, select=list):
+        self.tenants = {tenant.tenant_id: tenant for tenant in tenants}
+        self.bot = bot
+        self.concurrency = concurrency
+        self.retry_time = retry_time
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        if client is None and HTTP_POOL_SIZE < concurrency:
+            logger.warning(
+                'HTTP_POOL_SIZE=%s меньше числа одновременных опросов %s, '
+                'опросы будут ждать соединения', HTTP_POOL_SIZE, concurrency
+            )
+        self.client = client or homework.make_api_client()
+        self.store = store or StateStore()
+        self.scheduler = AdaptiveScheduler(retry_time)
+        self.alerts = ErrorNotifier()
+        self.outbox = outbox or Outbox(self.store.db_path)
+        self.in_flight = set()
+        self.delivery = DeliveryQueue(
+            partial(homework.send_message_to, bot),
+            on_delivered=self.on_delivered, on_failed=self.on_failed
+        )
+        self.coalescer = Coalescer(self.delivery.put, coalesce_window)
+        self.deadlines = DeadlineQueue()
+        self.cache = StatusCache(
+            self.fetch_statuses, known=self.store.get_statuses
+        )
+        self.commands = StatusCommands(self.cache, [
+            (tenant.chat_id, tenant.tenant_id) for tenant in tenants
+        ], on_refresh=self.request_poll)
+        self.commands_enabled = commands
+        self.lease = lease
+        self.watcher = ConfigWatcher(self.request_reload) if watch else None
+        self.select = select
+        self.tenants_lock = asyncio.Lock()
+        self.reload_lock = asyncio.Lock()
+        self.updater = None
+        self.tasks = set()
+        self.polling = {}
+        self.due = {}
+        self.loop = None
+        self.running = None
+        self.stopping = False
+        self.semaphore = None
+        self.wakeup = None
+        self.started = int(time.time())
+        self.register_metrics()
+
+    def register_metrics(self):
+        """Размеры очередей движка в метриках."""
+        QUEUE_DEPTH.set_function(self.delivery.qsize, queue='delivery')
+        QUEUE_DEPTH.set_function(self.coalescer.qsize, queue='coalescer')
+        QUEUE_DEPTH.set_function(
+            lambda: len(self.in_flight), queue='outbox_in_flight'
+        )
+        QUEUE_DEPTH.set_function(
+            lambda: len(self.deadlines), queue='scheduled'
+        )
+
+    async def call(self, func, *args):
+        """Выполнение блокирующего вызова в пуле потоков."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def poll_tenant(self, tenant):
+        """Один цикл опроса студента: запрос, проверка, уведомление.
+
+        Сообщения только ставятся в очередь отправки, поэтому опрос
+        не ждет Telegram. Возвращает количество новых сообщений.
+        """
+        async with self.semaphore:
+            current_timestamp = self.store.get_watermark(
+                tenant.tenant_id
+            ) or self.started
+            requested_at = int(time.time())
+            api_answer = await self.call(
+                homework.request_api, tenant.headers, current_timestamp,
+                self.client, self.timeout(tenant.tenant_id),
+                requested_at - current_timestamp > STREAM_WINDOW
+            )
+            try:
+                homeworks = homework.validate_response(api_answer)
+            except ResponseEmptyHW:
+                self.store.set_watermark(
+                    tenant.tenant_id,
+                    homework.next_watermark(api_answer, requested_at)
+                )
+                raise
+            self.cache.update(tenant.tenant_id, homeworks)
+            added = await self.call(
+                homework.record_changes, self.outbox, self.store,
+                tenant.tenant_id, tenant.chat_id, homeworks
+            )
+            for message in added:
+                self.enqueue(message)
+            self.store.set_watermark(
+                tenant.tenant_id,
+                homework.next_watermark(api_answer, requested_at)
+            )
+            return len(added)
+
+    def fetch_statuses(self, tenant_id):
+        """Все текущие работы студента для команд бота."""
+        return fetch_statuses(self.tenants[tenant_id].headers, self.client)
+
+    async def start_commands(self):
+        """Запуск приема команд /status и /refresh."""
+        if self.commands_enabled:
+            self.updater = await self.call(
+                start_commands, self.bot, self.commands
+            )
+
+    def timeout(self, tenant_id):
+        """Таймауты запроса по времени, оставшемуся до следующего опроса.
+
+        Следующий опрос ожидается через интервал после срока текущего.
+        Если опрос запущен с опозданием, например ждал в семафоре,
+        запросу остается меньше времени. Каждый таймаут не больше
+        половины остатка, но не меньше API_MIN_TIMEOUT.
+        """
+        interval = self.scheduler.interval(tenant_id)
+        due = self.due.pop(tenant_id, None)
+        remaining = interval
+        if due is not None:
+            remaining = due + interval - time.monotonic()
+        budget = max(remaining / 2, API_MIN_TIMEOUT)
+        return (
+            min(homework.API_CONNECT_TIMEOUT, budget),
+            min(homework.API_READ_TIMEOUT, budget),
+        )
+
+    def enqueue(self, message):
+        """Передача уведомления из outbox на отправку."""
+        self.in_flight.add(message.message_key)
+        self.coalescer.add(
+            message.chat_id, message.homework_key, message.text,
+            message.message_key
+        )
+
+    def on_delivered(self, keys):
+        """Отметка отправленных уведомлений в outbox."""
+        self.outbox.ack(keys)
+        self.in_flight.difference_update(keys)
+
+    def on_failed(self, keys):
+        """Возврат неотправленных уведомлений для повтора из outbox."""
+        self.in_flight.difference_update(keys)
+
+    async def outbox_loop(self):
+        """Повторная отправка неотмеченных уведомлений из outbox.
+
+        Первый проход при запуске отправляет то, что не успело уйти
+        до перезапуска.
+        """
+        while True:
+            pending = await self.call(self.outbox.pending)
+            chats = {str(tenant.chat_id) for tenant in self.tenants.values()}
+            replayed = [
+                message for message in pending
+                if message.message_key not in self.in_flight
+                and message.chat_id in chats
+            ]
+            for message in replayed:
+                self.enqueue(message)
+            if replayed:
+                logger.info('Повторно отправляется: %s', len(replayed))
+            await asyncio.sleep(OUTBOX_RETRY_INTERVAL)
+
+    def alert(self, tenant, text):
+        """Отправка уведомления о сбое мимо outbox, если оно есть."""
+        if text is not None:
+            self.delivery.put(str(tenant.chat_id), text)
+
+    async def run_poll(self, tenant):
+        """Опрос студента и постановка следующего опроса в очередь."""
+        tenant_id = tenant.tenant_id
+        try:
+            changed = await self.poll_tenant(tenant)
+        except ResponseEmptyHW:
+            self.scheduler.on_success(tenant_id)
+            self.alert(tenant, self.alerts.on_success(tenant_id))
+        except CircuitOpen as error:
+            logger.debug('Опрос [%s] пропущен: %s', tenant_id, error)
+        except Exception as error:
+            logger.info('Сбой в работе программы [%s]: %s', tenant_id, error)
+            self.scheduler.on_error(tenant_id)
+            self.alert(tenant, self.alerts.on_error(tenant_id, error))
+        else:
+            self.scheduler.on_success(
+                tenant_id, changed, self.store.get_statuses(tenant_id)
+            )
+            self.alert(tenant, self.alerts.on_success(tenant_id))
+        if tenant_id in self.tenants:
+            self.schedule(tenant_id, self.scheduler.next_delay(tenant_id))
+
+    def schedule(self, tenant_id, delay):
+        """Постановка опроса студента через delay секунд."""
+        deadline = time.monotonic() + delay
+        head = self.deadlines.next_deadline()
+        self.deadlines.schedule(tenant_id, deadline)
+        if self.wakeup is not None and (head is None or deadline < head):
+            self.wakeup.set()
+
+    def on_poll_done(self, tenant_id, task):
+        """Снятие отметки о выполняющемся опросе."""
+        if self.polling.get(tenant_id) is task:
+            del self.polling[tenant_id]
+
+    async def release_chats(self, chat_ids):
+        """Снятие с отправки уведомлений чатов, отданных другому процессу."""
+        if not chat_ids:
+            return
+        dropped = self.coalescer.drop(chat_ids) + self.delivery.drop(chat_ids)
+        self.in_flight.difference_update(dropped)
+        if dropped:
+            logger.info('Снято с отправки уведомлений: %s', len(dropped))
+        await self.delivery.settle(chat_ids)
+
+    async def set_tenants(self, tenants):
+        """Замена списка студентов с учетом только разницы.
+
+        Исключенные студенты снимаются с расписания, их начатые опросы
+        дожидаются завершения, состояние записывается в базу. Их еще не
+        отправленные уведомления снимаются с отправки без отметки в outbox,
+        чтобы их отправил только новый владелец, начатые отправки
+        дожидаются завершения. Состояние добавленных перечитывается
+        из базы, так как до этого их мог опрашивать другой процесс.
+        Возвращает списки добавленных и исключенных.
+        """
+        async with self.tenants_lock:
+            tenants = {tenant.tenant_id: tenant for tenant in tenants}
+            added = [tenant_id for tenant_id in tenants
+                     if tenant_id not in self.tenants]
+            removed = [tenant_id for tenant_id in self.tenants
+                       if tenant_id not in tenants]
+            released = {
+                str(self.tenants[tenant_id].chat_id) for tenant_id in removed
+            } - {str(tenant.chat_id) for tenant in tenants.values()}
+            self.tenants = tenants
+            self.commands.chats = {
+                str(tenant.chat_id): tenant.tenant_id
+                for tenant in tenants.values()
+            }
+            for tenant_id in removed:
+                self.deadlines.cancel(tenant_id)
+                self.due.pop(tenant_id, None)
+                self.scheduler.forget(tenant_id)
+                self.cache.forget(tenant_id)
+            running = [
+                self.polling[tenant_id] for tenant_id in removed
+                if tenant_id in self.polling
+            ]
+            if running:
+                await asyncio.wait(running)
+            await self.release_chats(released)
+            await self.call(self.store.flush)
+            await self.call(self.store.reload, added)
+            self.schedule_first(added)
+        logger.info(
+            'Студенты обновлены: добавлено %s, исключено %s',
+            len(added), len(removed)
+        )
+        return added, removed
+
+    def request_reload(self):
+        """Перечитывание настроек по запросу из другого потока."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.start_reload)
+
+    def start_reload(self):
+        """Запуск перечитывания настроек в цикле событий."""
+        task = asyncio.ensure_future(self.reload())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def reload(self):
+        """Чтение настроек и применение только изменившегося."""
+        async with self.reload_lock:
+            try:
+                config = await self.call(read_config)
+            except Exception as error:
+                logger.error('Настройки не применены: %s', error)
+                return None
+            return await self.apply_config(config)
+
+    async def apply_config(self, config):
+        """Применение настроек без перезапуска.
+
+        Статусы и токен Практикума переносятся в homework, новый
+        интервал действует со следующего опроса. Опросы затрагиваются
+        только у добавленных и исключенных студентов; у студентов
+        со сменившимся токеном или чатом сбрасывается кэш статусов.
+        Возвращает названия изменившихся настроек.
+        """
+        changed = apply_globals(config)
+        if config.retry_time != self.retry_time:
+            self.retry_time = config.retry_time
+            self.scheduler.set_base(config.retry_time)
+        token = config.telegram_token
+        if token and token != getattr(self.bot, 'token', token):
+            await self.set_bot(make_bot(token))
+            homework.TELEGRAM_TOKEN = token
+            changed.append('TELEGRAM_TOKEN')
+        updated = []
+        if config.tenants:
+            tenants = self.select(config.tenants)
+            updated = diff_tenants(
+                self.tenants, {tenant.tenant_id: tenant for tenant in tenants}
+            )
+            added, removed = await self.set_tenants(tenants)
+            for tenant_id in updated:
+                self.cache.forget(tenant_id)
+            if added or removed or updated:
+                changed.append('студенты')
+        else:
+            logger.error('В настройках нет студентов, список не изменен')
+        logger.info(
+            'Настройки перечитаны, изменено: %s, студентов с новым токеном '
+            'или чатом: %s', ', '.join(changed) or 'ничего', len(updated)
+        )
+        return changed
+
+    async def set_bot(self, bot):
+        """Замена бота: отправка и прием команд идут через новый токен."""
+        self.bot = bot
+        self.delivery.send = partial(homework.send_message_to, bot)
+        if self.updater is not None:
+            await self.call(self.updater.stop)
+            self.updater = None
+            await self.start_commands()
+
+    def schedule_first(self, tenant_ids):
+        """Постановка первых опросов студентов.
+
+        Опросы равномерно распределяются по интервалу, чтобы не
+        отправлять все запросы к API одновременно, и не ставятся раньше
+        интервала от прошлого опроса, даже если его выполнял другой
+        процесс.
+        """
+        step = self.retry_time / max(len(tenant_ids), 1)
+        now = time.time()
+        for index, tenant_id in enumerate(tenant_ids):
+            delay = index * step
+            watermark = self.store.get_watermark(tenant_id)
+            if watermark is not None:
+                delay = max(delay, watermark + self.retry_time - now)
+            self.schedule(tenant_id, delay)
+
+    def poll_now(self, tenant_id):
+        """Внеочередной опрос студента, если он сейчас не опрашивается."""
+        if tenant_id in self.deadlines:
+            self.schedule(tenant_id, 0)
+
+    def request_poll(self, tenant_id):
+        """Внеочередной опрос по запросу из другого потока."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.poll_now, tenant_id)
+
+    def stop(self):
+        """Остановка движка без ожидания следующих опросов."""
+        self.stopping = True
+        if self.running is not None:
+            self.running.cancel()
+
+    async def dispatch_loop(self):
+        """Запуск опросов, срок которых наступил."""
+        while True:
+            self.wakeup.clear()
+            now = time.monotonic()
+            for tenant_id, deadline in self.deadlines.pop_due_items(now):
+                POLL_LAG.observe(now - deadline)
+                tenant = self.tenants.get(tenant_id)
+                if tenant is not None:
+                    self.due[tenant_id] = deadline
+                    task = asyncio.ensure_future(self.run_poll(tenant))
+                    self.tasks.add(task)
+                    self.polling[tenant_id] = task
+                    task.add_done_callback(self.tasks.discard)
+                    task.add_done_callback(
+                        partial(self.on_poll_done, tenant_id)
+                    )
+            deadline = self.deadlines.next_deadline()
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def flush_loop(self):
+        """Периодическая запись состояния в базу."""
+        while True:
+            await asyncio.sleep(STATE_FLUSH_INTERVAL)
+            await self.call(self.store.flush)
+
+    async def wait_lease(self):
+        """Ожидание аренды в резерве.
+
+        Получив аренду, движок перечитывает состояние, которое до этого
+        записывал прежний держатель.
+        """
+        if await self.call(self.lease.acquire):
+            return
+        logger.info('Резервный режим: опрос выполняет другой процесс')
+        while not await self.call(self.lease.acquire):
+            await asyncio.sleep(self.lease.check_interval)
+        await self.call(self.store.load)
+
+    async def lease_loop(self):
+        """Продление аренды, при ее потере движок останавливается."""
+        while self.lease is not None:
+            await asyncio.sleep(self.lease.check_interval)
+            try:
+                held = await self.call(self.lease.acquire)
+            except Exception as error:
+                logger.error('Аренда не продлена: %s', error)
+                continue
+            if not held:
+                logger.error('Аренда потеряна, движок останавливается')
+                self.stop()
+                return
+
+    async def run(self):
+        """Запуск опроса всех студентов.
+
+        С арендой движок сначала ждет ее в резерве и работает, пока
+        ее удается продлевать.
+        """
+        self.loop = asyncio.get_running_loop()
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.wakeup = asyncio.Event()
+        try:
+            if self.lease is not None:
+                self.running = asyncio.ensure_future(self.wait_lease())
+                await self.running
+            self.schedule_first(list(self.tenants))
+            if self.watcher is not None:
+                self.watcher.start()
+            logger.info('Движок запущен, студентов: %s', len(self.tenants))
+            self.running = asyncio.gather(
+                self.flush_loop(), self.dispatch_loop(), self.delivery.run(),
+                self.outbox_loop(), self.start_commands(), self.lease_loop()
+            )
+            await self.running
+        except asyncio.CancelledError:
+            if not self.stopping:
+                raise
+            logger.info('Движок остановлен')
+        finally:
+            if self.updater is not None:
+                self.updater.stop()
+            if self.watcher is not None:
+                self.watcher.stop()
+            self.coalescer.flush_all()
+            for task in list(self.tasks):
+                task.cancel()
+            self.executor.shutdown(wait=False)
+            self.client.close()
+            self.store.close()
+            self.outbox.close()
+            if self.lease is not None:
+                self.lease.close()
+
+
+def get_tenants():
+    """Список студентов из TENANTS_FILE или из переменных окружения."""
+    if TENANTS_FILE:
+        return load_tenants(TENANTS_FILE)
+    if homework.PRACTICUM_TOKEN and homework.TELEGRAM_CHAT_ID:
+        return [Tenant(homework.PRACTICUM_TOKEN, homework.TELEGRAM_CHAT_ID)]
+    return []
+
+
+def make_bot(token, base_url=None):
+    """Бот Telegram с пулом соединений на отправку и прием команд."""
+    import telegram
+    from telegram.utils.request import Request
+
+    request = Request(con_pool_size=DELIVERY_WORKERS + COMMAND_WORKERS + 4)
+    return telegram.Bot(
+        token=token, base_url=base_url, request=request
+    )
+
+
+async def serve(engine):
+    """Работа движка до SIGTERM или SIGINT, SIGHUP перечитывает настройки."""
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, engine.stop)
+    loop.add_signal_handler(signal.SIGHUP, engine.start_reload)
+    await engine.run()
+
+
+def main():
+    """Запуск движка для всех студентов."""
+    setup_logging()
+    tenants = get_tenants()
+    if not homework.TELEGRAM_TOKEN or not tenants:
+        message = 'Один из токенов отсутствует!'
+        logger.critical(message)
+        raise TokenMissing(message)
+
+    apply_globals(read_config())
+    bot = make_bot(homework.TELEGRAM_TOKEN)
+    start_server()
+    engine = PollingEngine(
+        tenants, bot, retry_time=homework.RETRY_TIME, commands=BOT_COMMANDS,
+        lease=Lease(ENGINE_LEASE), watch=True
+    )
+    asyncio.run(serve(engine))
+
+
+if __name__ == '__main__':
+    main()
@@ -56,3 +56,9 @@ class MessageNotSent(Exception):
     """Исключение при неотправке сообщения."""
 
     pass
+
+
+class CircuitOpen(Exception):
+    """Исключение при запросе к API, помеченному как недоступное."""
+
+    pass
@@ -1,24 +1,30 @@
 import logging
-import requests
-import telegram
-import telegram.ext
+import signal
 import time
-import logging.config
 
 from dotenv import load_dotenv
+from functools import partial
 from http import HTTPStatus
-from os import getenv, path
+from os import environ, getenv
 
+from alerts import ErrorNotifier
+from breaker import GuardedClient
+from decoding import read_stream, response_json
+from diff import diff_homeworks
 from exceptions import (ResponseEmptyHW, TokenMissing,
                         ResponseWrongStatus, ResponseMissingHW,
                         StatusUnknown, MessageNotSent, ResponseNotAJSON,
                         ResponseMissingKeysVal)
-
+from lease import Lease
+from logs import SAMPLE, setup_logging
+from metrics import start_server, timed
+from outbox import Message, Outbox, message_key
+from scheduler import AdaptiveScheduler, PollTrigger
+from state import StateStore, homework_key
+from validator import ResponseValidator
+
+PROCESS_ENV_KEYS = frozenset(environ)
 load_dotenv()
-logging.config.fileConfig(
-    path.join(path.dirname(__file__), 'logging.ini'),
-    disable_existing_loggers=False
-)
 logger = logging.getLogger('hw_bot')
 
 PRACTICUM_TOKEN = getenv('PRACTICUM_TOKEN')
@@ -26,6 +32,9 @@ TELEGRAM_TOKEN = getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = getenv('TELEGRAM_CHAT_ID')
 
 RETRY_TIME = 600
+WATERMARK_OVERLAP = int(getenv('WATERMARK_OVERLAP', 60))
+API_CONNECT_TIMEOUT = 5
+API_READ_TIMEOUT = 30
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
@@ -35,11 +44,18 @@ HOMEWORK_STATUSES = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+VALIDATOR = ResponseValidator(HOMEWORK_STATUSES)
 
 
 def send_message(bot, message):
     """Отправка сообщения ботом."""
-    msg = bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
+    send_message_to(bot, TELEGRAM_CHAT_ID, message)
+
+
+@timed('send_message')
+def send_message_to(bot, chat_id, message):
+    """Отправка сообщения ботом в указанный чат."""
+    msg = bot.send_message(chat_id=chat_id, text=message)
 
     if msg['text'] != message:
         status = 'не отправлено'
@@ -47,14 +63,76 @@ def send_message(bot, message):
         raise MessageNotSent(status)
 
     else:
-        logger.info('отправлено')
+        logger.info('отправлено', extra=SAMPLE)
+
+
+def make_api_client(pool_size=None):
+    """Клиент API: пул соединений, дублирование запросов, предохранитель.
+
+    Размер пула по умолчанию берется из HTTP_POOL_SIZE. Для дублирующих
+    запросов пул вдвое больше, чтобы второй запрос не ждал соединения,
+    занятого первым.
+    С API_REPLAY ответы берутся из файла записи вместо API, с API_RECORD
+    каждый ответ API дописывается в файл записи.
+    """
+    from http_client import (API_HEDGE, HTTP_POOL_SIZE, HedgedClient,
+                             PooledClient)
+    from replay import (API_RECORD, API_REPLAY, Recording, RecordingClient,
+                        ReplayClient)
+
+    pool_size = pool_size or HTTP_POOL_SIZE
+    if API_REPLAY:
+        client = ReplayClient(Recording.load(API_REPLAY))
+    elif API_HEDGE:
+        client = HedgedClient(PooledClient(pool_size * 2), pool_size * 2)
+    else:
+        client = PooledClient(pool_size)
+    if API_RECORD:
+        client = RecordingClient(client, API_RECORD)
+    return GuardedClient(client)
 
 
 def get_api_answer(current_timestamp):
     """Получение ответа от API домашки."""
-    timestamp = current_timestamp or int(time.time())
-    params = {'from_date': timestamp}
-    response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+    return request_api(HEADERS, current_timestamp)
+
+
+@timed('get_api_answer')
+def request_api(headers, current_timestamp, client=None, timeout=None,
+                stream=False):
+    """Запрос к API домашки с заголовками конкретного студента.
+
+    client - общий пул соединений PooledClient, без него
+    выполняется отдельный запрос requests.get.
+    timeout - пара (соединение, чтение) в секундах.
+    stream - потоковый разбор больших ответов: работы читаются по одной
+    и сокращаются до нужных боту полей.
+    """
+    if current_timestamp is None:
+        current_timestamp = int(time.time())
+    params = {'from_date': current_timestamp}
+    if client is None:
+        import requests
+        client = requests
+    response = client.get(
+        ENDPOINT, headers=headers, params=params,
+        timeout=timeout or (API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+        stream=stream
+    )
+    try:
+        return read_response(response, stream)
+    finally:
+        close = getattr(response, 'close', None)
+        if close is not None:
+            close()
+
+
+def read_response(response, stream=False):
+    """Проверка статуса и разбор ответа API домашки.
+
+    Ответ закрывает вызывающий request_api: при ошибке статуса или
+    разбора потоковый ответ иначе не вернул бы соединение в пул.
+    """
     reason = HTTPStatus(response.status_code).phrase
 
     if reason == HTTPStatus.NOT_FOUND.phrase:
@@ -68,9 +146,12 @@ def get_api_answer(current_timestamp):
         raise ResponseWrongStatus(message)
 
     else:
-        logger.info('Ответ от API получен')
+        logger.info('Ответ от API получен', extra=SAMPLE)
         try:
-            resp_dict = response.json()
+            if stream:
+                resp_dict = read_stream(response)
+            else:
+                resp_dict = response_json(response)
         except Exception as exc:
             message = f'При преобразовании из JSON возникла проблема { exc }'
             logger.error(message)
@@ -79,6 +160,7 @@ def get_api_answer(current_timestamp):
             return resp_dict
 
 
+@timed('check_response')
 def check_response(response):
     """Проверка полученного в get_api_answer() ответа."""
     if not isinstance(response, dict):
@@ -103,10 +185,11 @@ def check_response(response):
 
     else:
         homeworks = response['homeworks']
-        logger.info('Ответ проверен')
+        logger.info('Ответ проверен', extra=SAMPLE)
         return homeworks
 
 
+@timed('parse_status')
 def parse_status(homework):
     """Сопоставление статуса из словаря и формирование сообщения в чат."""
     if 'homework_name' not in homework or 'status' not in homework:
@@ -131,53 +214,294 @@ def parse_status(homework):
 
         else:
             verdict = HOMEWORK_STATUSES[homework_status]
-            logger.info('Сформирован текст сообщения')
+            logger.info('Сформирован текст сообщения', extra=SAMPLE)
             return ('Изменился статус проверки работы'
                     f' "{homework_name}". {verdict}')
 
 
+def next_watermark(response, requested_at):
+    """Отметка времени для следующего запроса по current_date ответа.
+
+    current_date - время сервера, поэтому окна from_date не зависят
+    от часов бота и времени отправки сообщений. Окно начинается
+    на WATERMARK_OVERLAP секунд раньше, чтобы не пропустить работы,
+    обновленные на сервере около current_date; повторно полученные
+    работы отсеиваются по id и статусу в record_changes(). Без
+    current_date отсчет идет от requested_at - времени отправки запроса.
+    """
+    current_date = response.get('current_date')
+    if not isinstance(current_date, int) or isinstance(current_date, bool):
+        logger.warning('В ответе нет current_date, отметка по часам бота')
+        current_date = requested_at
+    return max(current_date - WATERMARK_OVERLAP, 0)
+
+
+@timed('validate_response')
+def validate_response(response):
+    """Проверка ответа и компактные записи работ за один проход."""
+    return VALIDATOR.validate(response)
+
+
+def collect_changes(store, tenant_id, homeworks):
+    """Тексты сообщений по работам с изменившимся статусом.
+
+    homeworks - записи, проверенные validate_response().
+    """
+    changed = diff_homeworks(homeworks, store.get_statuses(tenant_id))
+    messages = [
+        (homework, VALIDATOR.message(homework)) for homework in changed
+    ]
+
+    if not messages:
+        logger.info(
+            'Статусы не изменились, сообщения не отправлены', extra=SAMPLE
+        )
+
+    return messages
+
+
+def record_changes(outbox, store, tenant_id, chat_id, homeworks):
+    """Запись уведомлений об изменившихся статусах в outbox.
+
+    Возвращает новые уведомления, отправляются они отдельно.
+    """
+    changes = collect_changes(store, tenant_id, homeworks)
+    added = outbox.add_many([
+        Message(message_key(tenant_id, homework), str(chat_id),
+                homework_key(homework), message)
+        for homework, message in changes
+    ])
+
+    for homework, _ in changes:
+        store.set_status(tenant_id, homework_key(homework), homework['status'])
+
+    return added
+
+
 def check_tokens():
     """Проверка токенов в окружении."""
     if PRACTICUM_TOKEN and TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
-        logger.info('Токены на месте')
+        logger.info('Токены на месте', extra=SAMPLE)
         return True
 
     else:
         return False
 
 
-def main():
-    """Основная логика работы бота."""
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    logger.info('Бот запущен...')
+def handle_signals(trigger):
+    """Остановка по SIGTERM и SIGINT, немедленный опрос по SIGUSR1.
+
+    SIGHUP перечитывает настройки.
+    """
+    signal.signal(signal.SIGTERM, lambda *_: trigger.stop())
+    signal.signal(signal.SIGINT, lambda *_: trigger.stop())
+    signal.signal(signal.SIGUSR1, lambda *_: trigger.poll_now())
+    signal.signal(signal.SIGHUP, lambda *_: trigger.reload())
+
+
+def reload_config(scheduler):
+    """Применение изменившихся настроек без перезапуска.
+
+    Токен Практикума, интервал опроса и тексты статусов применяются
+    сразу; токен Telegram и чат определяют бота и студента, поэтому
+    требуют перезапуска.
+    """
+    from config import apply_globals, read_config
+
+    try:
+        config = read_config()
+    except Exception as error:
+        logger.error('Настройки не применены: %s', error)
+        return
+    changed = apply_globals(config)
+    scheduler.set_base(RETRY_TIME)
+    if (config.telegram_token != TELEGRAM_TOKEN
+            or config.chat_id != TELEGRAM_CHAT_ID):
+        logger.warning('Токен Telegram и чат применятся после перезапуска')
+    logger.info(
+        'Настройки перечитаны, изменено: %s', ', '.join(changed) or 'ничего'
+    )
+
+
+def poll_once(client, store, outbox, cache, tenant_id, current_timestamp):
+    """Опрос API, проверка ответа и запись уведомлений в outbox.
+
+    Отметка времени студента сдвигается по ответу, в том числе
+    по ответу без работ. Возвращает количество новых уведомлений.
+    """
+    if not check_tokens():
+        message = 'Один из токенов отсутствует!'
+        logger.critical(message)
+        raise TokenMissing(message)
+
+    requested_at = int(time.time())
+    api_answer = request_api(HEADERS, current_timestamp, client)
+    try:
+        homeworks = validate_response(api_answer)
+    except ResponseEmptyHW:
+        store.set_watermark(
+            tenant_id, next_watermark(api_answer, requested_at)
+        )
+        raise
+    cache.update(tenant_id, homeworks)
+    changed = record_changes(
+        outbox, store, tenant_id, TELEGRAM_CHAT_ID, homeworks
+    )
+    store.set_watermark(tenant_id, next_watermark(api_answer, requested_at))
+    return len(changed)
+
+
+def send_alert(send, chat_id, text):
+    """Отправка уведомления о сбое, если оно есть, без влияния на опрос."""
+    if text is None:
+        return
+    try:
+        send(chat_id, text)
+    except Exception as error:
+        logger.error('Уведомление о сбое не отправлено: %s', error)
+
+
+def wait_for_lease(lease, trigger):
+    """Ожидание аренды в резерве, False - пора останавливаться."""
+    logger.info('Резервный режим: опрос выполняет другой процесс')
+    while not lease.acquire():
+        if not trigger.wait(lease.check_interval):
+            return False
+    return True
+
+
+def resume_lease(lease, trigger, store, tenant_id):
+    """Возврат из резерва с арендой, False - пора останавливаться.
+
+    Получив аренду после резерва, бот перечитывает состояние студента,
+    которое записывал прежний держатель.
+    """
+    if not wait_for_lease(lease, trigger):
+        return False
+    store.reload([tenant_id])
+    return True
 
-    while True:
 
-        try:
+def ensure_commands(updater, bot, commands):
+    """Запуск приема команд, если он включен и еще не запущен."""
+    from commands import BOT_COMMANDS, start_commands
 
-            if not check_tokens():
-                message = 'Один из токенов отсутствует!'
-                logger.critical(message)
-                raise TokenMissing(message)
+    if updater is None and BOT_COMMANDS and check_tokens():
+        return start_commands(bot, commands)
+    return updater
 
-            else:
-                api_answer = get_api_answer(current_timestamp)
-                homework = check_response(api_answer)[0]
-                message = parse_status(homework)
-                logger.info('Сообщение с'
-                            ' обновленным статусом')
-                send_message(bot, message)
-                current_timestamp = int(time.time())
-
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logger.info(message)
-            time.sleep(RETRY_TIME)
 
-        else:
-            time.sleep(RETRY_TIME)
+def stop_commands(updater):
+    """Остановка приема команд, если он запущен.
+
+    В резерве команды не принимаются: два процесса с getUpdates
+    получают от Telegram ошибку 409.
+    """
+    if updater is not None:
+        updater.stop()
+    return None
+
+
+def main():
+    """Основная логика работы бота для одного студента.
+
+    Уведомления отправляются прямо в цикле опроса, без очереди
+    отправки и ограничения частоты. Процесс worker по умолчанию -
+    движок engine.py, который отправляет через DeliveryQueue.
+    """
+    import telegram
+    from telegram.utils.request import Request
+
+    from commands import (COMMAND_WORKERS, StatusCache, StatusCommands,
+                          fetch_statuses)
+    from config import ConfigWatcher, apply_globals, read_config
+
+    setup_logging()
+    apply_globals(read_config())
+    bot = telegram.Bot(
+        token=TELEGRAM_TOKEN,
+        request=Request(con_pool_size=COMMAND_WORKERS + 4)
+    )
+    client = make_api_client()
+    store = StateStore()
+    outbox = Outbox()
+    send = partial(send_message_to, bot)
+    scheduler = AdaptiveScheduler(RETRY_TIME)
+    alerts = ErrorNotifier()
+    tenant_id = str(TELEGRAM_CHAT_ID)
+    started = int(time.time())
+    trigger = PollTrigger()
+    handle_signals(trigger)
+    cache = StatusCache(
+        lambda _: fetch_statuses(HEADERS, client), known=store.get_statuses
+    )
+    commands = StatusCommands(
+        cache, [(TELEGRAM_CHAT_ID, tenant_id)],
+        on_refresh=lambda _: trigger.poll_now()
+    )
+    updater = None
+    lease = Lease(f'tenant:{tenant_id}', store.db_path)
+    lease.keep_alive()
+    watcher = ConfigWatcher(trigger.reload)
+    watcher.start()
+    start_server()
+    logger.info('Бот запущен...')
+
+    try:
+        while True:
+
+            if not lease.acquire():
+                updater = stop_commands(updater)
+                if not resume_lease(lease, trigger, store, tenant_id):
+                    break
+
+            if trigger.take_reload():
+                reload_config(scheduler)
+
+            updater = ensure_commands(updater, bot, commands)
+
+            try:
+                changed = poll_once(
+                    client, store, outbox, cache, tenant_id,
+                    store.get_watermark(tenant_id) or started
+                )
+                scheduler.on_success(
+                    tenant_id, changed, store.get_statuses(tenant_id)
+                )
+                alert = alerts.on_success(tenant_id)
+
+            except ResponseEmptyHW as error:
+                logger.info('Сбой в работе программы: %s', error)
+                scheduler.on_success(tenant_id)
+                alert = alerts.on_success(tenant_id)
+
+            except Exception as error:
+                logger.info('Сбой в работе программы: %s', error)
+                scheduler.on_error(tenant_id)
+                alert = alerts.on_error(tenant_id, error)
+
+            store.flush()
+            send_alert(send, TELEGRAM_CHAT_ID, alert)
+            outbox.drain(send, TELEGRAM_CHAT_ID)
+            if not trigger.wait(scheduler.next_delay(tenant_id)):
+                break
+
+    finally:
+        stop_commands(updater)
+        watcher.stop()
+        lease.close()
+        client.close()
+        store.close()
+        outbox.close()
+        logger.info('Бот остановлен')
 
 
 if __name__ == '__main__':
-    main()
+    # Запущенный скрипт - отдельная копия модуля: config и commands
+    # импортируют homework и меняют настройки в нем, поэтому работать
+    # должен импортированный модуль. Набор переменных процесса берется
+    # из копии, где он снят до load_dotenv().
+    import homework as module
+
+    module.PROCESS_ENV_KEYS = PROCESS_ENV_KEYS
+    module.main()
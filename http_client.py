@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from os import getenv
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import HTTP_REQUESTS, HTTP_SECONDS
+
+logger = logging.getLogger('hw_bot')
+
+HTTP_POOL_SIZE = int(getenv('HTTP_POOL_SIZE', 64))
+HTTP_POOL_TIMEOUT = float(getenv('HTTP_POOL_TIMEOUT', 10))
+TIMINGS_HISTORY = 1000
+API_HEDGE = getenv('API_HEDGE', '') == '1'
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+
+RequestTiming = namedtuple(
+    'RequestTiming', ['connect', 'tls', 'ttfb', 'total', 'reused']
+)
+
+_local = threading.local()
+
+
+class TimedConnectionMixin:
+    """Замер времени установки TCP и ожидания первого байта ответа.
+
+    Время до первого байта считается от отправки запроса по уже
+    установленному соединению, без TCP и TLS.
+    """
+
+    def _new_conn(self):
+        started = time.perf_counter()
+        conn = super()._new_conn()
+        _local.connect = time.perf_counter() - started
+        return conn
+
+    def getresponse(self, *args, **kwargs):
+        started = time.perf_counter()
+        response = super().getresponse(*args, **kwargs)
+        _local.ttfb = time.perf_counter() - started
+        return response
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    """Соединение, замеряющее время установки TCP."""
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    """Соединение, замеряющее время установки TCP и TLS."""
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _local.tls = time.perf_counter() - started - _local.connect
+
+
+class PoolTimeoutMixin:
+    """Ожидание свободного соединения не дольше pool_timeout секунд.
+
+    requests не передает таймаут пула, и при pool_block=True запрос
+    без него ждал бы освобождения соединения бесконечно.
+    """
+
+    pool_timeout = HTTP_POOL_TIMEOUT
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(
+            self.pool_timeout if timeout is None else timeout
+        )
+
+
+class TimedHTTPConnectionPool(PoolTimeoutMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(PoolTimeoutMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """Адаптер requests с замером времени установки соединений."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+
+def observe_timing(timing):
+    """Учет времен запроса в метриках.
+
+    Время TCP и TLS учитывается только для новых соединений.
+    """
+    HTTP_REQUESTS.inc(reused=str(timing.reused).lower())
+    if not timing.reused:
+        HTTP_SECONDS.observe(timing.connect, phase='connect')
+        if timing.tls:
+            HTTP_SECONDS.observe(timing.tls, phase='tls')
+    HTTP_SECONDS.observe(timing.ttfb, phase='ttfb')
+    HTTP_SECONDS.observe(timing.total, phase='total')
+
+
+class PooledClient:
+    """Общая сессия с пулом keep-alive соединений к API.
+
+    Один экземпляр переиспользуется между опросами и студентами.
+    Каждому ответу добавляется атрибут timing с временем установки
+    TCP, TLS и получения первого байта, эти же времена попадают
+    в метрику http_request_seconds.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE):
+        self.session = requests.Session()
+        adapter = TimedAdapter(
+            pool_connections=4, pool_maxsize=pool_size, pool_block=True
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        """GET-запрос через пул соединений."""
+        _local.connect = 0.0
+        _local.tls = 0.0
+        _local.ttfb = 0.0
+        started = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        timing = RequestTiming(
+            connect=_local.connect,
+            tls=_local.tls,
+            ttfb=_local.ttfb,
+            total=time.perf_counter() - started,
+            reused=not _local.connect,
+        )
+        response.timing = timing
+        observe_timing(timing)
+        logger.debug(
+            'Запрос %s: connect=%.3fs tls=%.3fs ttfb=%.3fs',
+            url, timing.connect, timing.tls, timing.ttfb
+        )
+        return response
+
+    def close(self):
+        """Закрытие всех соединений пула."""
+        self.session.close()
+
+
+class HedgedClient:
+    """Клиент с дублирующим запросом при долгом ответе.
+
+    Если ответ не пришел за время p95 последних запросов, тот же
+    запрос отправляется повторно, и используется первый успешный
+    ответ. Опоздавший ответ закрывается, возвращая соединение в пул.
+    """
+
+    def __init__(self, client, workers=HTTP_POOL_SIZE):
+        self.client = client
+        self.latencies = deque(maxlen=TIMINGS_HISTORY)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.hedged = 0
+
+    def hedge_delay(self):
+        """Время ожидания перед дублирующим запросом или None."""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        p95 = ordered[int(len(ordered) * 0.95) - 1]
+        return max(p95, HEDGE_MIN_DELAY)
+
+    def timed_get(self, url, kwargs):
+        """Запрос с замером длительности."""
+        started = time.perf_counter()
+        response = self.client.get(url, **kwargs)
+        self.latencies.append(time.perf_counter() - started)
+        return response
+
+    def get(self, url, **kwargs):
+        """GET-запрос с дублированием по p95."""
+        delay = self.hedge_delay()
+        if delay is None:
+            return self.timed_get(url, kwargs)
+
+        futures = {self.executor.submit(self.timed_get, url, kwargs)}
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            self.hedged += 1
+            logger.debug('Дублирующий запрос к %s через %.3fs', url, delay)
+            futures.add(self.executor.submit(self.timed_get, url, kwargs))
+
+        error = None
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for late in futures:
+                        late.add_done_callback(close_response)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def close(self):
+        """Остановка потоков и закрытие клиента."""
+        self.executor.shutdown(wait=False)
+        self.client.close()
+
+
+def close_response(future):
+    """Закрытие ответа опоздавшего запроса."""
+    if future.exception() is None:
+        future.result().close()
@@ -0,0 +1,141 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from os import getenv
+
+from state import STATE_DB
+
+logger = logging.getLogger('hw_bot')
+
+LEASE_TTL = float(getenv('LEASE_TTL', 15))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires REAL NOT NULL
+);
+'''
+
+
+def pid_alive(pid):
+    """Проверка, что процесс с таким pid существует."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Lease:
+    """Аренда имени в общей базе SQLite для резервных процессов.
+
+    Опрашивает и отправляет только держатель аренды, остальные ждут
+    в резерве. Держатель продлевает аренду каждую треть ttl; если он
+    перестал продлевать, аренда переходит к другому по истечении ttl,
+    а если его процесс на этом же хосте завершился - сразу.
+    """
+
+    def __init__(self, name, db_path=STATE_DB, ttl=LEASE_TTL,
+                 clock=time.time):
+        self.name = name
+        self.ttl = ttl
+        self.clock = clock
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.owner = f'{self.host}:{self.pid}:{uuid.uuid4().hex[:8]}'
+        self.held = False
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.connection = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    @property
+    def check_interval(self):
+        """Период продления аренды и проверки резервом."""
+        return self.ttl / 3
+
+    def acquire(self):
+        """Захват или продление аренды, True - аренда у этого процесса."""
+        now = self.clock()
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                self.connection.execute(
+                    'INSERT INTO leases VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, '
+                    'host = excluded.host, pid = excluded.pid, '
+                    'expires = excluded.expires '
+                    'WHERE leases.owner = excluded.owner '
+                    'OR leases.expires < ?',
+                    (self.name, self.owner, self.host, self.pid,
+                     now + self.ttl, now)
+                )
+                owner, host, pid = self.connection.execute(
+                    'SELECT owner, host, pid FROM leases WHERE name = ?',
+                    (self.name,)
+                ).fetchone()
+                if (owner != self.owner and host == self.host
+                        and not pid_alive(pid)):
+                    logger.warning(
+                        'Держатель аренды %s завершился, аренда перехвачена',
+                        self.name
+                    )
+                    self.connection.execute(
+                        'UPDATE leases SET owner = ?, pid = ?, expires = ? '
+                        'WHERE name = ?',
+                        (self.owner, self.pid, now + self.ttl, self.name)
+                    )
+                    owner = self.owner
+                self.connection.execute('COMMIT')
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+        held = owner == self.owner
+        if held != self.held:
+            logger.info(
+                'Аренда %s %s', self.name, 'получена' if held else 'потеряна'
+            )
+        self.held = held
+        return held
+
+    def release(self):
+        """Освобождение аренды для резервного процесса."""
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM leases WHERE name = ? AND owner = ?',
+                (self.name, self.owner)
+            )
+        self.held = False
+
+    def keep_alive(self):
+        """Продление аренды в фоновом потоке, пока она у этого процесса."""
+        def renew():
+            while not self.stopped.wait(self.check_interval):
+                if self.held:
+                    try:
+                        self.acquire()
+                    except sqlite3.Error as error:
+                        logger.error('Аренда не продлена: %s', error)
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Освобождение аренды и закрытие базы."""
+        self.stopped.set()
+        self.release()
+        self.connection.close()
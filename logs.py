@@ -0,0 +1,153 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
+from os import getenv, path
+
+LOGGING_CONFIG = getenv('LOGGING_CONFIG', path.join(
+    path.dirname(path.abspath(__file__)), 'logging.ini'
+))
+LOG_QUEUE = getenv('LOG_QUEUE', '1') not in ('0', '')
+LOG_FORMAT = getenv('LOG_FORMAT', 'text')
+LOG_SAMPLE_EVERY = int(getenv('LOG_SAMPLE_EVERY', 100))
+LOG_QUEUE_SIZE = int(getenv('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_KEYS = int(getenv('LOG_SAMPLE_KEYS', 1024))
+LOGGERS = ('', 'hw_bot')
+SAMPLE = {'sample': True}
+
+
+class SamplingFilter(logging.Filter):
+    """Пропуск только каждой every-й повторяющейся записи INFO и ниже.
+
+    Прореживаются только записи, отмеченные extra=SAMPLE: строки,
+    которые пишутся при каждом опросе или отправке. Записи считаются
+    по шаблону сообщения, поэтому одинаковые строки с разными
+    аргументами попадают в одну группу. Первая запись группы проходит
+    всегда, WARNING и выше и неотмеченные записи не прореживаются.
+    Счетчики хранятся не больше чем для size шаблонов, при переполнении
+    забываются давно не встречавшиеся.
+    """
+
+    def __init__(self, every=LOG_SAMPLE_EVERY, size=LOG_SAMPLE_KEYS):
+        super().__init__()
+        self.every = max(int(every), 1)
+        self.size = max(int(size), 1)
+        self.counts = OrderedDict()
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if (self.every == 1 or record.levelno > logging.INFO
+                or not getattr(record, 'sample', False)):
+            return True
+        key = (record.name, record.msg)
+        with self.lock:
+            count = self.counts.pop(key, 0)
+            self.counts[key] = count + 1
+            if len(self.counts) > self.size:
+                self.counts.popitem(last=False)
+        if count % self.every:
+            return False
+        if count:
+            record.sampled = self.every
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """Постановка записей в очередь без форматирования в вызывающем потоке.
+
+    Сообщение и его аргументы форматируются уже в потоке слушателя,
+    поэтому аргументы не должны меняться после вызова логгера.
+    Переполненная очередь не блокирует опрос: запись отбрасывается.
+    """
+
+    dropped = 0
+    listener = None
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON."""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'sampled', None):
+            data['sampled'] = record.sampled
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def stop_listener(listener):
+    """Остановка слушателя с записью оставшихся в очереди записей."""
+    if listener._thread is not None:
+        listener.stop()
+
+
+@lru_cache(maxsize=None)
+def load_config(config_file=LOGGING_CONFIG):
+    """Однократная загрузка настроек логирования из файла."""
+    import logging.config
+
+    logging.config.fileConfig(config_file, disable_existing_loggers=False)
+
+
+def setup_logging(enabled=LOG_QUEUE, log_format=LOG_FORMAT,
+                  sample_every=LOG_SAMPLE_EVERY, names=LOGGERS,
+                  config_file=LOGGING_CONFIG):
+    """Настройка логирования и перевод логгеров на очередь.
+
+    Настройки из logging.ini загружаются один раз, затем их обработчики
+    переезжают в QueueListener, а логгеры получают один LazyQueueHandler
+    с прореживанием INFO. Повторный вызов возвращает уже запущенный
+    слушатель. Формат JSON применяется и без очереди; если очередь
+    выключена, возвращает None.
+    """
+    if config_file:
+        load_config(config_file)
+    loggers = [logging.getLogger(name) for name in names]
+    handlers = []
+    for logger in loggers:
+        for handler in logger.handlers:
+            if isinstance(handler, LazyQueueHandler):
+                return handler.listener
+            if handler not in handlers:
+                handlers.append(handler)
+    if log_format == 'json':
+        for handler in handlers:
+            handler.setFormatter(JsonFormatter())
+    if not enabled:
+        return None
+
+    queue_handler = LazyQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(SamplingFilter(sample_every))
+    for logger in loggers:
+        logger.handlers = [queue_handler]
+
+    listener = QueueListener(
+        queue_handler.queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    queue_handler.listener = listener
+    atexit.register(stop_listener, listener)
+    return listener
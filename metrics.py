@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import getenv
+
+logger = logging.getLogger('hw_bot')
+
+METRICS_PORT = getenv('METRICS_PORT')
+METRICS_HOST = getenv('METRICS_HOST', '127.0.0.1')
+PREFIX = 'hw_bot_'
+BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300
+)
+
+
+def format_labels(labels, extra=None):
+    """Метки в формате Prometheus."""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    body = ','.join(f'{name}="{value}"' for name, value in pairs)
+    return f'{{{body}}}'
+
+
+class Metric:
+    """Базовая метрика с набором рядов по меткам."""
+
+    kind = None
+
+    def __init__(self, name, description):
+        self.name = PREFIX + name
+        self.description = description
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def header(self):
+        """Строки HELP и TYPE."""
+        return [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Увеличение счетчика."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def render(self):
+        """Текстовое представление."""
+        with self.lock:
+            series = list(self.series.items())
+        return self.header() + [
+            f'{self.name}{format_labels(key)} {value}'
+            for key, value in series
+        ]
+
+
+class Gauge(Metric):
+    """Текущее значение, задается явно или функцией."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        """Установка значения."""
+        with self.lock:
+            self.series[tuple(sorted(labels.items()))] = value
+
+    def set_function(self, func, **labels):
+        """Значение вычисляется функцией при каждом чтении."""
+        self.set(func, **labels)
+
+    def render(self):
+        """Текстовое представление."""
+        with self.lock:
+            series = list(self.series.items())
+        lines = self.header()
+        for key, value in series:
+            if callable(value):
+                value = value()
+            lines.append(f'{self.name}{format_labels(key)} {value}')
+        return lines
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, buckets=BUCKETS):
+        super().__init__(name, description)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        """Учет одного значения."""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """Текстовое представление с накопленными корзинами."""
+        with self.lock:
+            series = [
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self.series.items()
+            ]
+        lines = self.header()
+        for key, counts, total, count in series:
+            accumulated = 0
+            for bound, bucket in zip(self.buckets, counts):
+                accumulated += bucket
+                labels = format_labels(key, ('le', bound))
+                lines.append(f'{self.name}_bucket{labels} {accumulated}')
+            labels = format_labels(key, ('le', '+Inf'))
+            lines.append(f'{self.name}_bucket{labels} {count}')
+            lines.append(f'{self.name}_sum{format_labels(key)} {total}')
+            lines.append(f'{self.name}_count{format_labels(key)} {count}')
+        return lines
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """Добавление метрики, повторная регистрация возвращает ее же."""
+        return self.metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'stage_seconds', 'Длительность этапов обработки'
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    'stage_errors_total', 'Исключения этапов обработки по классам'
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'queue_depth', 'Размер внутренних очередей'
+))
+POLL_LAG = REGISTRY.register(Histogram(
+    'poll_lag_seconds', 'Опоздание опроса относительно расписания'
+))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    'http_request_seconds', 'Этапы запросов к API: connect, tls, ttfb, total'
+))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'Запросы к API по переиспользованию соединения'
+))
+
+
+def timed(stage):
+    """Декоратор замера длительности и исключений этапа."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as error:
+                STAGE_ERRORS.inc(
+                    stage=stage, exception=type(error).__name__
+                )
+                raise
+            finally:
+                STAGE_SECONDS.observe(
+                    time.perf_counter() - started, stage=stage
+                )
+        return wrapper
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдача метрик по GET /metrics."""
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode()
+        self.send_response(200)
+        self.send_header(
+            'Content-Type', 'text/plain; version=0.0.4; charset=utf-8'
+        )
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Запуск HTTP-сервера метрик в фоновом потоке."""
+    if port in (None, ''):
+        return None
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info('Метрики доступны на http://%s:%s/metrics', host, port)
+    return server
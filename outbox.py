@@ -0,0 +1,125 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from collections import namedtuple
+from os import getenv
+
+from state import STATE_DB, homework_key
+
+logger = logging.getLogger('hw_bot')
+
+OUTBOX_KEEP = int(getenv('OUTBOX_KEEP', 7 * 24 * 3600))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS outbox (
+    message_key TEXT PRIMARY KEY,
+    chat_id TEXT NOT NULL,
+    homework_key TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    sent REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (sent, created);
+'''
+
+Message = namedtuple(
+    'Message', ['message_key', 'chat_id', 'homework_key', 'text']
+)
+
+
+def message_key(tenant_id, homework):
+    """Ключ уведомления: студент, работа, статус и время изменения."""
+    return ':'.join((
+        tenant_id, homework_key(homework), str(homework.get('status')),
+        str(homework.get('date_updated', ''))
+    ))
+
+
+class Outbox:
+    """Журнал исходящих уведомлений в SQLite.
+
+    Уведомление записывается до отправки и отмечается после нее.
+    Неотмеченные уведомления отправляются повторно, в том числе после
+    перезапуска, а повторная запись того же ключа игнорируется.
+    """
+
+    def __init__(self, db_path=STATE_DB, keep=OUTBOX_KEEP):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        with self.connection:
+            self.connection.execute(
+                'DELETE FROM outbox WHERE sent < ?', (time.time() - keep,)
+            )
+
+    def add_many(self, messages):
+        """Запись уведомлений одной транзакцией.
+
+        Возвращает только новые уведомления, дубликаты отбрасываются.
+        """
+        added = []
+        now = time.time()
+        with self.lock, self.connection:
+            for message in messages:
+                cursor = self.connection.execute(
+                    'INSERT OR IGNORE INTO outbox '
+                    'VALUES (?, ?, ?, ?, ?, NULL)',
+                    (*message, now)
+                )
+                if cursor.rowcount:
+                    added.append(message)
+        duplicates = len(messages) - len(added)
+        if duplicates:
+            logger.info('Пропущено повторных уведомлений: %s', duplicates)
+        return added
+
+    def ack(self, keys):
+        """Отметка уведомлений как отправленных."""
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                'UPDATE outbox SET sent = ? WHERE message_key = ?',
+                ((now, key) for key in keys)
+            )
+
+    def pending(self, chat_id=None):
+        """Неотправленные уведомления в порядке записи.
+
+        chat_id - только уведомления этого чата: база общая для
+        процессов, отправляющих в разные чаты.
+        """
+        query = (
+            'SELECT message_key, chat_id, homework_key, text FROM outbox '
+            'WHERE sent IS NULL'
+        )
+        params = ()
+        if chat_id is not None:
+            query += ' AND chat_id = ?'
+            params = (str(chat_id),)
+        with self.lock:
+            rows = self.connection.execute(
+                query + ' ORDER BY created, rowid', params
+            ).fetchall()
+        return [Message(*row) for row in rows]
+
+    def drain(self, send, chat_id=None):
+        """Отправка всех неотправленных уведомлений по порядку.
+
+        chat_id - отправлять только уведомления этого чата.
+        При первой ошибке отправка прекращается до следующего вызова.
+        """
+        for message in self.pending(chat_id):
+            try:
+                send(message.chat_id, message.text)
+            except Exception as error:
+                logger.error('Уведомление отложено: %s', error)
+                return False
+            self.ack([message.message_key])
+        return True
+
+    def close(self):
+        """Закрытие базы."""
+        self.connection.close()
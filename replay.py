@@ -0,0 +1,187 @@
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from os import getenv
+
+logger = logging.getLogger('hw_bot')
+
+API_RECORD = getenv('API_RECORD')
+API_REPLAY = getenv('API_REPLAY')
+API_REPLAY_SPEED = float(getenv('API_REPLAY_SPEED', 1))
+RECORD_FLUSH_EVERY = 100
+UNAUTHORIZED = (
+    '{"code": "not_authenticated", '
+    '"message": "Учетные данные не были предоставлены."}'
+)
+
+
+def tenant_key(headers):
+    """Обезличенный ключ студента по заголовку авторизации."""
+    token = (headers or {}).get('Authorization', '')
+    return hashlib.blake2b(token.encode(), digest_size=6).hexdigest()
+
+
+class Recorder:
+    """Запись ответов API в сжатый файл, одна строка JSON на ответ.
+
+    В строке: offset - секунды от начала записи, tenant - ключ студента
+    вместо токена, from_date, status, elapsed - длительность запроса
+    и body - тело ответа без изменений. Файл дописывается, поэтому
+    несколько запусков собираются в одну запись; {pid} в пути
+    разводит по своим файлам процессы супервизора.
+    """
+
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path.format(pid=os.getpid())
+        self.clock = clock
+        self.started = clock()
+        self.file = gzip.open(self.path, 'at', encoding='utf-8')
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, headers, params, response, elapsed):
+        """Запись одного ответа."""
+        line = json.dumps({
+            'offset': round(self.clock() - self.started, 3),
+            'tenant': tenant_key(headers),
+            'from_date': (params or {}).get('from_date'),
+            'status': response.status_code,
+            'elapsed': round(elapsed, 4),
+            'body': response.content.decode('utf-8', 'replace'),
+        }, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            self.file.write(line + '\n')
+            self.count += 1
+            if self.count % RECORD_FLUSH_EVERY == 0:
+                self.file.flush()
+
+    def close(self):
+        """Дозапись буфера и закрытие файла."""
+        with self.lock:
+            self.file.close()
+        logger.info('Записано ответов API: %s в %s', self.count, self.path)
+
+
+class RecordingClient:
+    """Клиент, записывающий каждый ответ обернутого клиента.
+
+    Тело читается целиком до записи, потоковый разбор затем идет
+    по уже прочитанному телу.
+    """
+
+    def __init__(self, client, path):
+        self.client = client
+        self.recorder = Recorder(path)
+
+    def get(self, url, **kwargs):
+        """GET-запрос с записью ответа."""
+        started = time.perf_counter()
+        response = self.client.get(url, **kwargs)
+        self.recorder.write(
+            kwargs.get('headers'), kwargs.get('params'), response,
+            time.perf_counter() - started
+        )
+        return response
+
+    def close(self):
+        """Закрытие записи и клиента."""
+        self.recorder.close()
+        self.client.close()
+
+
+def load_recording(path):
+    """Записанные ответы по студентам в порядке записи."""
+    tenants = {}
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                entry = json.loads(line)
+                tenants.setdefault(entry['tenant'], []).append(entry)
+    for entries in tenants.values():
+        entries.sort(key=lambda entry: entry['offset'])
+    return tenants
+
+
+class Recording:
+    """Воспроизведение записанных ответов во времени записи.
+
+    Студенту отдается последний ответ, записанный к текущему моменту
+    воспроизведения, то есть смены статусов повторяются с исходными
+    интервалами, ускоренными в speed раз, независимо от частоты опроса.
+    После конца записи отдается последний ответ. При speed=0 ответы
+    отдаются по очереди на каждый запрос и без задержки.
+    """
+
+    def __init__(self, tenants, speed=API_REPLAY_SPEED, clock=time.monotonic):
+        self.tenants = tenants
+        self.offsets = {
+            tenant: [entry['offset'] for entry in entries]
+            for tenant, entries in tenants.items()
+        }
+        self.speed = speed
+        self.clock = clock
+        self.started = clock()
+        self.cursors = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, speed=API_REPLAY_SPEED, clock=time.monotonic):
+        """Воспроизведение файла записи."""
+        return cls(load_recording(path), speed, clock)
+
+    def entry(self, tenant):
+        """Ответ для студента или None, если его нет в записи."""
+        entries = self.tenants.get(tenant)
+        if not entries:
+            return None
+        if self.speed:
+            position = (self.clock() - self.started) * self.speed
+            index = bisect.bisect_right(self.offsets[tenant], position) - 1
+        else:
+            with self.lock:
+                index = self.cursors.get(tenant, 0)
+                self.cursors[tenant] = index + 1
+        return entries[min(max(index, 0), len(entries) - 1)]
+
+    def latency(self, entry):
+        """Задержка ответа, ускоренная в speed раз."""
+        return entry['elapsed'] / self.speed if self.speed else 0
+
+
+class ReplayClient:
+    """Клиент, отвечающий из записи вместо обращения к API.
+
+    Неизвестный записи студент получает 401, как с неверным токеном.
+    """
+
+    def __init__(self, recording):
+        self.recording = recording
+
+    def get(self, url, headers=None, params=None, timeout=None,
+            stream=False):
+        """Ответ из записи с исходной задержкой."""
+        import requests
+
+        entry = self.recording.entry(tenant_key(headers))
+        if entry is None:
+            status, body = 401, UNAUTHORIZED
+        else:
+            time.sleep(self.recording.latency(entry))
+            status, body = entry['status'], entry['body']
+        response = requests.Response()
+        response.url = url
+        response.status_code = status
+        response.encoding = 'utf-8'
+        response.headers['Content-Type'] = 'application/json'
+        response._content = body.encode()
+        response._content_consumed = True
+        return response
+
+    def close(self):
+        """Закрывать нечего."""
@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+
+from os import getenv
+
+POLL_MIN_INTERVAL = int(getenv('POLL_MIN_INTERVAL', 120))
+POLL_MAX_INTERVAL = int(getenv('POLL_MAX_INTERVAL', 3600))
+POLL_JITTER = float(getenv('POLL_JITTER', 0.1))
+ACTIVE_WINDOW = 3600
+IDLE_AFTER = 24 * 3600
+HOT_STATUSES = ('reviewing',)
+
+
+class TenantActivity:
+    """История опросов одного студента."""
+
+    def __init__(self, now):
+        self.last_change = None
+        self.first_seen = now
+        self.errors = 0
+        self.hot = False
+
+
+class AdaptiveScheduler:
+    """Выбор времени следующего опроса по активности студента.
+
+    Работы на проверке и недавние изменения опрашиваются чаще,
+    давно не менявшиеся - реже, ошибки увеличивают интервал
+    экспоненциально. К интервалу добавляется ограниченный разброс,
+    чтобы опросы студентов не собирались в одну точку.
+    """
+
+    def __init__(self, base, min_interval=POLL_MIN_INTERVAL,
+                 max_interval=POLL_MAX_INTERVAL, jitter=POLL_JITTER,
+                 rng=None, clock=time.time):
+        self.limits = (min_interval, max_interval)
+        self.set_base(base)
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.clock = clock
+        self.activity = {}
+
+    def set_base(self, base):
+        """Смена базового интервала, границы подстраиваются под него."""
+        min_interval, max_interval = self.limits
+        self.base = base
+        self.min_interval = min(min_interval, base)
+        self.max_interval = max(max_interval, base)
+
+    def get_activity(self, tenant_id):
+        """История студента, создается при первом обращении."""
+        activity = self.activity.get(tenant_id)
+        if activity is None:
+            activity = self.activity[tenant_id] = TenantActivity(self.clock())
+        return activity
+
+    def on_success(self, tenant_id, changed=0, statuses=None):
+        """Учет успешного опроса."""
+        activity = self.get_activity(tenant_id)
+        activity.errors = 0
+        if changed:
+            activity.last_change = self.clock()
+        if statuses is not None:
+            activity.hot = any(
+                status in HOT_STATUSES for status in statuses.values()
+            )
+
+    def on_error(self, tenant_id):
+        """Учет неудачного опроса."""
+        self.get_activity(tenant_id).errors += 1
+
+    def forget(self, tenant_id):
+        """Удаление истории студента."""
+        self.activity.pop(tenant_id, None)
+
+    def interval(self, tenant_id):
+        """Интервал до следующего опроса без разброса."""
+        activity = self.get_activity(tenant_id)
+        if activity.errors:
+            return min(
+                self.base * 2 ** (activity.errors - 1), self.max_interval
+            )
+
+        now = self.clock()
+        last_change = activity.last_change
+        if activity.hot or (
+            last_change is not None and now - last_change < ACTIVE_WINDOW
+        ):
+            return self.min_interval
+
+        if now - (last_change or activity.first_seen) > IDLE_AFTER:
+            return self.max_interval
+        return self.base
+
+    def next_delay(self, tenant_id):
+        """Интервал до следующего опроса с учетом разброса."""
+        spread = self.rng.uniform(-self.jitter, self.jitter)
+        return self.interval(tenant_id) * (1 + spread)
+
+
+class DeadlineQueue:
+    """Очередь сроков следующего опроса на двоичной куче.
+
+    Добавление и перенос срока - O(log n), отмена - O(1): старая
+    запись помечается недействительной и пропускается при извлечении.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def schedule(self, key, deadline):
+        """Постановка или перенос срока для ключа."""
+        self.cancel(key)
+        entry = [deadline, next(self.counter), key, True]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.compact()
+
+    def cancel(self, key):
+        """Отмена срока для ключа."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            entry[3] = False
+
+    def deadline(self, key):
+        """Текущий срок для ключа или None."""
+        entry = self.entries.get(key)
+        return entry[0] if entry else None
+
+    def next_deadline(self):
+        """Ближайший срок в очереди или None."""
+        heap = self.heap
+        while heap and not heap[0][3]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now):
+        """Извлечение всех ключей со сроком не позже now."""
+        return [key for key, _ in self.pop_due_items(now)]
+
+    def pop_due_items(self, now):
+        """Извлечение пар (ключ, срок) со сроком не позже now."""
+        due = []
+        heap = self.heap
+        while heap and (not heap[0][3] or heap[0][0] <= now):
+            deadline, _, key, valid = heapq.heappop(heap)
+            if valid:
+                del self.entries[key]
+                due.append((key, deadline))
+        return due
+
+    def compact(self):
+        """Удаление из кучи отмененных записей."""
+        self.heap = [entry for entry in self.heap if entry[3]]
+        heapq.heapify(self.heap)
+
+
+class PollTrigger:
+    """Прерываемое ожидание следующего опроса.
+
+    Ожидание прерывается запросом немедленного опроса poll_now(),
+    перечитывания настроек reload() или остановкой stop(). Эти методы
+    можно вызывать из других потоков и из обработчиков сигналов.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.requested = False
+        self.reload_requested = False
+        self.stopped = False
+
+    def poll_now(self):
+        """Запрос немедленного опроса."""
+        with self.condition:
+            self.requested = True
+            self.condition.notify_all()
+
+    def reload(self):
+        """Запрос перечитывания настроек перед следующим опросом."""
+        with self.condition:
+            self.reload_requested = True
+            self.requested = True
+            self.condition.notify_all()
+
+    def take_reload(self):
+        """True, если настройки нужно перечитать; запрос снимается."""
+        with self.condition:
+            requested = self.reload_requested
+            self.reload_requested = False
+            return requested
+
+    def stop(self):
+        """Запрос остановки."""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def wait(self, timeout):
+        """Ожидание срока или запроса, False - пора останавливаться."""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.requested or self.stopped, timeout
+            )
+            self.requested = False
+            return not self.stopped
@@ -0,0 +1,72 @@
+import bisect
+import hashlib
+
+from os import getenv
+
+SHARD_REPLICAS = int(getenv('SHARD_REPLICAS', 128))
+SHARD_INDEX = int(getenv('SHARD_INDEX', 0))
+SHARD_COUNT = int(getenv('SHARD_COUNT', 1))
+
+
+def hash_key(key):
+    """Стабильный между процессами 64-битный хеш строки."""
+    digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Кольцо консистентного хеширования ключей по узлам.
+
+    Каждый узел занимает replicas точек кольца, ключ принадлежит узлу
+    ближайшей по часовой стрелке точки. При добавлении или удалении
+    узла переезжает только доля ключей, приходящаяся на этот узел.
+    """
+
+    def __init__(self, nodes=(), replicas=SHARD_REPLICAS):
+        self.replicas = replicas
+        self.points = []
+        self.owners = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        """Добавление узла."""
+        for replica in range(self.replicas):
+            point = hash_key(f'{node}#{replica}')
+            if point not in self.owners:
+                bisect.insort(self.points, point)
+            self.owners[point] = node
+
+    def remove(self, node):
+        """Удаление узла."""
+        for replica in range(self.replicas):
+            point = hash_key(f'{node}#{replica}')
+            if self.owners.get(point) == node:
+                del self.owners[point]
+                self.points.remove(point)
+
+    def node_for(self, key):
+        """Узел, которому принадлежит ключ, или None для пустого кольца."""
+        if not self.points:
+            return None
+        index = bisect.bisect(self.points, hash_key(key)) % len(self.points)
+        return self.owners[self.points[index]]
+
+
+def assign(tenants, nodes, node):
+    """Студенты, которых по кольцу из nodes должен опрашивать node."""
+    ring = HashRing(nodes)
+    return [
+        tenant for tenant in tenants
+        if ring.node_for(tenant.tenant_id) == node
+    ]
+
+
+def node_tenants(tenants, index=SHARD_INDEX, count=SHARD_COUNT):
+    """Доля студентов для узла index из count, например дино Heroku."""
+    if count <= 1:
+        return list(tenants)
+    return assign(
+        tenants, [f'node-{number}' for number in range(count)],
+        f'node-{index}'
+    )
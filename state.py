@@ -0,0 +1,144 @@
+import logging
+import sqlite3
+import threading
+
+from os import getenv, path
+
+logger = logging.getLogger('hw_bot')
+
+STATE_DB = getenv(
+    'STATE_DB', path.join(path.dirname(__file__), 'homework_state.db')
+)
+STATE_BATCH_SIZE = int(getenv('STATE_BATCH_SIZE', 500))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS watermarks (
+    tenant_id TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant_id TEXT NOT NULL,
+    homework_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (tenant_id, homework_key)
+);
+'''
+
+
+def homework_key(homework):
+    """Ключ домашней работы: id, а при его отсутствии название."""
+    return str(homework.get('id') or homework.get('homework_name'))
+
+
+class StateStore:
+    """Хранилище отметки времени и последних статусов в SQLite.
+
+    Состояние целиком держится в памяти, изменения копятся и
+    записываются в базу пачками одной транзакцией.
+    """
+
+    def __init__(self, db_path=STATE_DB, batch_size=STATE_BATCH_SIZE):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.watermarks = {}
+        self.statuses = {}
+        self.pending_watermarks = {}
+        self.pending_statuses = {}
+        self.load()
+
+    def load(self):
+        """Загрузка всего состояния из базы в память."""
+        self.watermarks = dict(self.connection.execute(
+            'SELECT tenant_id, from_date FROM watermarks'
+        ))
+        self.statuses = {}
+        rows = self.connection.execute(
+            'SELECT tenant_id, homework_key, status FROM statuses'
+        )
+        for tenant_id, key, status in rows:
+            self.statuses.setdefault(tenant_id, {})[key] = status
+        logger.info(
+            'Состояние загружено: студентов %s', len(self.watermarks)
+        )
+
+    def reload(self, tenant_ids):
+        """Перечитывание состояния студентов из базы.
+
+        Нужно, когда студентов до этого опрашивал другой процесс.
+        """
+        with self.lock:
+            for tenant_id in tenant_ids:
+                row = self.connection.execute(
+                    'SELECT from_date FROM watermarks WHERE tenant_id = ?',
+                    (tenant_id,)
+                ).fetchone()
+                if row is None:
+                    self.watermarks.pop(tenant_id, None)
+                else:
+                    self.watermarks[tenant_id] = row[0]
+                self.statuses[tenant_id] = dict(self.connection.execute(
+                    'SELECT homework_key, status FROM statuses '
+                    'WHERE tenant_id = ?', (tenant_id,)
+                ))
+
+    def get_watermark(self, tenant_id, default=None):
+        """Отметка времени, с которой нужно запрашивать статусы."""
+        return self.watermarks.get(tenant_id, default)
+
+    def set_watermark(self, tenant_id, from_date):
+        """Сдвиг отметки времени студента."""
+        with self.lock:
+            self.watermarks[tenant_id] = from_date
+            self.pending_watermarks[tenant_id] = from_date
+        self.maybe_flush()
+
+    def get_status(self, tenant_id, key):
+        """Последний известный статус домашней работы."""
+        return self.statuses.get(tenant_id, {}).get(key)
+
+    def get_statuses(self, tenant_id):
+        """Все известные статусы работ студента."""
+        return self.statuses.get(tenant_id, {})
+
+    def set_status(self, tenant_id, key, status):
+        """Сохранение статуса домашней работы."""
+        with self.lock:
+            self.statuses.setdefault(tenant_id, {})[key] = status
+            self.pending_statuses[(tenant_id, key)] = status
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        """Запись пачки, если накопилось достаточно изменений."""
+        pending = len(self.pending_watermarks) + len(self.pending_statuses)
+        if pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Запись накопленных изменений одной транзакцией."""
+        with self.lock:
+            watermarks = self.pending_watermarks
+            statuses = self.pending_statuses
+            self.pending_watermarks = {}
+            self.pending_statuses = {}
+            if not watermarks and not statuses:
+                return
+            with self.connection:
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO watermarks VALUES (?, ?)',
+                    watermarks.items()
+                )
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?)',
+                    ((tenant_id, key, status)
+                     for (tenant_id, key), status in statuses.items())
+                )
+
+    def close(self):
+        """Запись оставшихся изменений и закрытие базы."""
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+from os import getenv
+
+import homework
+from config import apply_globals, read_config
+from engine import PollingEngine, get_tenants, make_bot, serve
+from exceptions import TokenMissing
+from lease import Lease
+from logs import setup_logging
+from sharding import SHARD_INDEX, assign, node_tenants
+
+logger = logging.getLogger('hw_bot')
+
+SHARD_WORKERS = int(getenv('SHARD_WORKERS', 0)) or os.cpu_count() or 1
+REBALANCE_TIMEOUT = int(getenv('REBALANCE_TIMEOUT', 60))
+STOP_TIMEOUT = int(getenv('STOP_TIMEOUT', 30))
+CHECK_INTERVAL = 1
+
+
+async def serve_worker(engine, connection, tenants, name, members=()):
+    """Работа движка с переназначением студентов по командам супервизора.
+
+    Супервизор присылает новый состав процессов, процесс оставляет себе
+    своих по кольцу студентов и подтверждает переназначение. При
+    перечитывании настроек процесс так же берет своих студентов
+    из нового списка.
+    """
+    loop = asyncio.get_running_loop()
+    rebalances = set()
+    members = list(members)
+
+    def select(configured):
+        tenants[:] = node_tenants(configured)
+        return assign(tenants, members, name)
+
+    async def rebalance(new_members):
+        members[:] = new_members
+        await engine.set_tenants(assign(tenants, members, name))
+        connection.send(name)
+
+    engine.select = select
+
+    def on_message():
+        try:
+            members = connection.recv()
+        except EOFError:
+            loop.remove_reader(connection.fileno())
+            engine.stop()
+            return
+        task = asyncio.ensure_future(rebalance(members))
+        rebalances.add(task)
+        task.add_done_callback(rebalances.discard)
+
+    loop.add_reader(connection.fileno(), on_message)
+    await serve(engine)
+
+
+def run_worker(name, members, connection):
+    """Процесс опроса студентов, доставшихся ему по кольцу."""
+    setup_logging()
+    apply_globals(read_config())
+    tenants = node_tenants(get_tenants())
+    engine = PollingEngine(
+        assign(tenants, members, name), make_bot(homework.TELEGRAM_TOKEN),
+        retry_time=homework.RETRY_TIME,
+        lease=Lease(f'engine:{SHARD_INDEX}:{name}'), watch=True
+    )
+    asyncio.run(serve_worker(engine, connection, tenants, name, members))
+
+
+class Supervisor:
+    """Запуск процессов опроса и перераспределение студентов между ними.
+
+    Студенты делятся между процессами консистентным хешированием.
+    При добавлении процесса остальные сначала отдают его студентов
+    и подтверждают это, и только потом он запускается; при удалении
+    процесс сначала останавливается, и только потом остальные забирают
+    его студентов. Так ни один студент не опрашивается дважды.
+    SIGTTIN добавляет процесс, SIGTTOU убирает, SIGHUP передается
+    процессам для перечитывания настроек, SIGTERM и SIGINT
+    останавливают все.
+    """
+
+    def __init__(self, size=SHARD_WORKERS, target=run_worker, context=None):
+        self.size = size
+        self.target = target
+        self.context = context or multiprocessing.get_context('spawn')
+        self.members = []
+        self.workers = {}
+        self.stopping = False
+        self.wakeup = threading.Event()
+
+    def start(self, name):
+        """Запуск процесса с текущим составом."""
+        connection, child = self.context.Pipe()
+        process = self.context.Process(
+            target=self.target, args=(name, list(self.members), child),
+            name=f'hw_bot-{name}'
+        )
+        process.start()
+        child.close()
+        self.workers[name] = (process, connection)
+        logger.info('Запущен процесс %s', name)
+
+    def stop(self, name):
+        """Остановка процесса с ожиданием завершения."""
+        process, connection = self.workers.pop(name)
+        process.terminate()
+        process.join(STOP_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        connection.close()
+        logger.info('Остановлен процесс %s', name)
+
+    def broadcast(self):
+        """Рассылка состава и ожидание подтверждений.
+
+        Не подтвердивший процесс перезапускается: новый экземпляр
+        стартует уже с новым составом.
+        """
+        self.check()
+        sent = []
+        for name, (process, connection) in self.workers.items():
+            try:
+                connection.send(list(self.members))
+            except OSError:
+                continue
+            sent.append(name)
+        for name, (process, connection) in list(self.workers.items()):
+            try:
+                if name in sent and connection.poll(REBALANCE_TIMEOUT):
+                    connection.recv()
+                    continue
+            except (EOFError, OSError):
+                pass
+            logger.error('Процесс %s не подтвердил перераспределение', name)
+            self.stop(name)
+            self.start(name)
+
+    def grow(self, count):
+        """Добавление count процессов."""
+        names = []
+        number = 0
+        while len(names) < count:
+            if f'w{number}' not in self.members:
+                names.append(f'w{number}')
+            number += 1
+        self.members.extend(names)
+        self.broadcast()
+        for name in names:
+            self.start(name)
+
+    def shrink(self, count):
+        """Удаление count последних процессов."""
+        names = self.members[-count:]
+        del self.members[-count:]
+        for name in names:
+            self.stop(name)
+        self.broadcast()
+
+    def check(self):
+        """Перезапуск неожиданно завершившихся процессов."""
+        for name, (process, connection) in list(self.workers.items()):
+            if not process.is_alive():
+                logger.error(
+                    'Процесс %s завершился с кодом %s', name, process.exitcode
+                )
+                self.workers.pop(name)
+                connection.close()
+                self.start(name)
+
+    def resize(self, delta):
+        """Изменение числа процессов по сигналу."""
+        self.size = max(self.size + delta, 1)
+        self.wakeup.set()
+
+    def shutdown(self):
+        """Запрос остановки по сигналу."""
+        self.stopping = True
+        self.wakeup.set()
+
+    def reload(self):
+        """Передача SIGHUP всем процессам."""
+        for name, (process, _) in list(self.workers.items()):
+            try:
+                os.kill(process.pid, signal.SIGHUP)
+            except (ProcessLookupError, TypeError):
+                logger.warning('Процесс %s не получил SIGHUP', name)
+
+    def handle_signals(self):
+        """Управление числом процессов и остановка сигналами."""
+        signal.signal(signal.SIGHUP, lambda *_: self.reload())
+        signal.signal(signal.SIGTTIN, lambda *_: self.resize(1))
+        signal.signal(signal.SIGTTOU, lambda *_: self.resize(-1))
+        signal.signal(signal.SIGTERM, lambda *_: self.shutdown())
+        signal.signal(signal.SIGINT, lambda *_: self.shutdown())
+
+    def step(self):
+        """Приведение процессов к заданному числу."""
+        self.check()
+        if len(self.members) < self.size:
+            self.grow(self.size - len(self.members))
+        elif len(self.members) > self.size:
+            self.shrink(len(self.members) - self.size)
+
+    def run(self):
+        """Работа до остановки."""
+        self.members = [f'w{number}' for number in range(self.size)]
+        for name in self.members:
+            self.start(name)
+        try:
+            while not self.stopping:
+                self.wakeup.clear()
+                self.step()
+                self.wakeup.wait(CHECK_INTERVAL)
+        finally:
+            for name in list(self.workers):
+                self.stop(name)
+
+
+def main():
+    """Запуск супервизора процессов опроса."""
+    setup_logging()
+    if not homework.TELEGRAM_TOKEN or not get_tenants():
+        message = 'Один из токенов отсутствует!'
+        logger.critical(message)
+        raise TokenMissing(message)
+    supervisor = Supervisor()
+    supervisor.handle_signals()
+    supervisor.run()
+
+
+if __name__ == '__main__':
+    main()
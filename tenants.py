@@ -0,0 +1,48 @@
+import json
+import logging
+
+from exceptions import TokenMissing
+
+logger = logging.getLogger('hw_bot')
+
+
+class Tenant:
+    """Студент: токен Практикума и чат Telegram для уведомлений."""
+
+    def __init__(self, practicum_token, chat_id, tenant_id=None):
+        self.practicum_token = practicum_token
+        self.chat_id = chat_id
+        self.tenant_id = str(tenant_id or chat_id)
+
+    @property
+    def headers(self):
+        """Заголовки запроса к API домашки."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+
+def load_tenants(file_path):
+    """Загрузка списка студентов из JSON-файла.
+
+    Файл содержит список объектов с ключами practicum_token, chat_id
+    и необязательным id.
+    """
+    with open(file_path, encoding='utf-8') as file:
+        entries = json.load(file)
+
+    if not isinstance(entries, list):
+        message = f'В файле {file_path} ожидается список студентов'
+        logger.error(message)
+        raise TypeError(message)
+
+    tenants = []
+    for entry in entries:
+        if not entry.get('practicum_token') or not entry.get('chat_id'):
+            message = f'У студента {entry.get("id")} отсутствует токен или чат'
+            logger.critical(message)
+            raise TokenMissing(message)
+        tenants.append(Tenant(
+            entry['practicum_token'], entry['chat_id'], entry.get('id')
+        ))
+
+    logger.info('Загружено студентов: %s', len(tenants))
+    return tenants
@@ -0,0 +1,19 @@
+class Clock:
+    """Часы, которые двигаются только вручную через now."""
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class MockBot:
+    """Бот, запоминающий отправленные сообщения."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+        return {'text': text}
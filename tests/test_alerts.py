@@ -0,0 +1,90 @@
+from alerts import ErrorNotifier
+from exceptions import CircuitOpen, ResponseEmptyHW, ResponseWrongStatus
+from tests.fixtures.doubles import Clock
+
+
+class TestErrorNotifier:
+
+    def test_repeats_suppressed(self):
+        clock = Clock()
+        notifier = ErrorNotifier(ttl=600, clock=clock)
+        error = ResponseWrongStatus('Код ответа Bad Gateway != OK')
+        first = notifier.on_error('1', error)
+        assert 'ResponseWrongStatus' in first and 'Bad Gateway' in first, (
+            'Проверьте, что первое появление сбоя отправляется'
+        )
+        clock.now = 300
+        assert notifier.on_error('1', error) is None, (
+            'Проверьте, что повтор сбоя в пределах ttl не отправляется'
+        )
+        assert notifier.on_error('2', error) is not None, (
+            'Проверьте, что сбои разных студентов учитываются отдельно'
+        )
+        clock.now = 700
+        reminder = notifier.on_error('1', error)
+        assert reminder is not None and 'Повторов за 12 мин: 1' in reminder, (
+            'Проверьте, что по истечении ttl уходит одно напоминание '
+            'с числом пропущенных повторов'
+        )
+
+    def test_recovery_summary(self):
+        clock = Clock()
+        notifier = ErrorNotifier(ttl=600, clock=clock)
+        assert notifier.on_success('1') is None, (
+            'Проверьте, что без сбоев сводка не отправляется'
+        )
+        for _ in range(3):
+            notifier.on_error('1', ResponseWrongStatus('Код ответа 502'))
+        clock.now = 120
+        summary = notifier.on_success('1')
+        assert summary is not None and 'за 2 мин' in summary, (
+            'Проверьте, что восстановление отправляет сводку'
+        )
+        assert 'ResponseWrongStatus: Код ответа 502 - 3 раз' in summary, (
+            'Проверьте, что сводка содержит число повторов сбоя'
+        )
+        assert notifier.on_success('1') is None, (
+            'Проверьте, что сводка отправляется один раз'
+        )
+        assert notifier.on_error(
+            '1', ResponseWrongStatus('Код ответа 502')
+        ) is not None, (
+            'Проверьте, что после восстановления новый сбой отправляется'
+        )
+
+    def test_volatile_parts_ignored(self):
+        notifier = ErrorNotifier()
+        first = ConnectionError('object at 0x7f01 from_date=1700000000')
+        second = ConnectionError('object at 0x7f99 from_date=1700000600')
+        assert notifier.on_error('1', first) is not None
+        assert notifier.on_error('1', second) is None, (
+            'Проверьте, что адреса объектов и метки времени не делают '
+            'сбой новым'
+        )
+
+    def test_threshold_and_ignored(self):
+        notifier = ErrorNotifier(after=3)
+        error = ResponseWrongStatus('Код ответа 500')
+        assert notifier.on_error('1', error) is None
+        assert notifier.on_error('1', error) is None
+        assert notifier.on_error('1', error) is not None, (
+            'Проверьте, что сбой отправляется после after повторов подряд'
+        )
+        notifier.on_success('1')
+        notifier.on_error('1', error)
+        assert notifier.on_success('1') is None, (
+            'Проверьте, что по неотправленным сбоям сводки нет'
+        )
+        assert notifier.on_error('1', CircuitOpen('open')) is None
+        assert notifier.on_error('1', ResponseEmptyHW('empty')) is None, (
+            'Проверьте, что пропуски опроса и пустые ответы не считаются '
+            'сбоями'
+        )
+
+    def test_cache_bounded(self):
+        notifier = ErrorNotifier(size=2)
+        for tenant_id in ('1', '2', '3'):
+            notifier.on_error(tenant_id, ResponseWrongStatus('500'))
+        assert len(notifier.incidents) == 2 and '1' not in notifier.tenants, (
+            'Проверьте, что при переполнении забывается самый давний сбой'
+        )
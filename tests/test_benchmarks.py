@@ -0,0 +1,57 @@
+from benchmarks import bench_pipeline, bench_startup
+
+
+class TestBenchmarks:
+
+    def test_pipeline_smoke(self, monkeypatch):
+        import homework
+        monkeypatch.setattr(homework, 'ENDPOINT', homework.ENDPOINT)
+        args = bench_pipeline.parse_args([
+            '--tenants', '20', '--duration', '2', '--interval', '0.5',
+            '--changes-per-sec', '20', '--api-errors', '0',
+        ])
+        result = bench_pipeline.run(args)
+        assert result['polls_per_sec'] > 0, (
+            'Проверьте, что конвейер опрашивает заглушку API'
+        )
+        assert result['notified'] > 0, (
+            'Проверьте, что изменения статусов доходят до заглушки Telegram'
+        )
+
+    def test_startup_smoke(self):
+        result = bench_startup.run(bench_startup.parse_args(['--runs', '1']))
+        assert result['first_poll'] > 0, (
+            'Проверьте, что запущенный бот опрашивает заглушку API'
+        )
+        assert result['import_homework'] < result['first_poll'], (
+            'Импорт должен укладываться во время до первого опроса'
+        )
+
+    def test_pipeline_replay_smoke(self, monkeypatch, tmp_path):
+        import homework
+        from benchmarks.stubs import StubPracticum
+        from http_client import PooledClient
+        from replay import RecordingClient
+
+        monkeypatch.setattr(homework, 'ENDPOINT', homework.ENDPOINT)
+        practicum = StubPracticum(['a', 'b'], changes_per_sec=0).start()
+        homework.ENDPOINT = f'{practicum.url}/api/user_api/homework_statuses/'
+        path = str(tmp_path / 'api.jsonl.gz')
+        client = RecordingClient(PooledClient(pool_size=1), path)
+        for token in ('a', 'b'):
+            homework.request_api({'Authorization': f'OAuth {token}'}, 0,
+                                 client)
+        client.close()
+        practicum.stop()
+
+        args = bench_pipeline.parse_args([
+            '--replay', path, '--replay-speed', '0', '--duration', '1',
+            '--interval', '0.2',
+        ])
+        result = bench_pipeline.run(args)
+        assert result['tenants'] == 2, (
+            'Проверьте, что студенты берутся из записи'
+        )
+        assert result['messages'] > 0, (
+            'Проверьте, что записанные работы доходят до заглушки Telegram'
+        )
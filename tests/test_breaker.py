@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+from breaker import CircuitBreaker, GuardedClient
+from exceptions import CircuitOpen
+from tests.fixtures.doubles import Clock
+
+
+class MockResponse:
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class MockClient:
+
+    def __init__(self, status_codes):
+        self.status_codes = status_codes
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        status_code = self.status_codes.pop(0)
+        if status_code is None:
+            raise requests.ConnectionError('Нет соединения')
+        return MockResponse(status_code)
+
+
+class TestCircuitBreaker:
+
+    def test_open_probe_close(self):
+        clock = Clock()
+        breaker = CircuitBreaker('api', threshold=2, reset_timeout=10,
+                                 clock=clock)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.on_failure()
+        with pytest.raises(CircuitOpen):
+            breaker.before_call()
+
+        clock.now += 10
+        breaker.before_call()
+        with pytest.raises(CircuitOpen):
+            breaker.before_call()
+        breaker.on_failure()
+        with pytest.raises(CircuitOpen):
+            breaker.before_call()
+
+        clock.now += 10
+        breaker.before_call()
+        breaker.on_success()
+        breaker.before_call()
+
+    def test_guarded_client(self):
+        client = MockClient([500, None, 404, 200])
+        guarded = GuardedClient(client, threshold=2, reset_timeout=60)
+        guarded.get('url')
+        with pytest.raises(requests.ConnectionError):
+            guarded.get('url')
+        with pytest.raises(CircuitOpen):
+            guarded.get('url')
+        assert client.calls == 2, (
+            'Проверьте, что открытый предохранитель не пропускает запросы'
+        )
+
+        other = MockClient([404, 404, 404])
+        guarded = GuardedClient(other, threshold=2)
+        for _ in range(3):
+            guarded.get('url')
+        assert other.calls == 3, (
+            'Проверьте, что ответы 4xx не открывают предохранитель'
+        )
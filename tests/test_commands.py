@@ -0,0 +1,167 @@
+import threading
+import time
+
+import homework
+from commands import (StatusCache, StatusCommands, fetch_statuses,
+                      format_statuses)
+from tests.fixtures.doubles import Clock
+
+RECORD = {'id': 1, 'homework_name': 'hw', 'status': 'approved',
+          'date_updated': ''}
+
+
+class MockMessage:
+
+    def __init__(self):
+        self.replies = []
+
+    def reply_text(self, text):
+        self.replies.append(text)
+
+
+class MockUpdate:
+
+    def __init__(self, chat_id):
+        self.effective_chat = type('Chat', (), {'id': chat_id})()
+        self.effective_message = MockMessage()
+
+
+class TestCommands:
+
+    def test_singleflight(self):
+        calls = []
+        release = threading.Event()
+
+        def fetch(tenant_id):
+            calls.append(tenant_id)
+            release.wait(5)
+            return [RECORD]
+
+        cache = StatusCache(fetch)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get('1')))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        while not calls:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert calls == ['1'], (
+            'Одновременные запросы статусов должны сливаться в один'
+        )
+        assert results == [[RECORD]] * 10
+
+    def test_ttl_and_update(self):
+        calls = []
+        clock = Clock()
+
+        def fetch(tenant_id):
+            calls.append(tenant_id)
+            return [RECORD]
+
+        cache = StatusCache(fetch, ttl=60, clock=clock)
+        cache.get('1')
+        clock.now = 30
+        changed = dict(RECORD, status='rejected')
+        cache.update('1', [changed])
+        assert cache.get('1') == [changed], (
+            'Опрос должен обновлять статусы в кэше'
+        )
+        assert cache.get('1', max_age=10) == [RECORD]
+        clock.now = 200
+        cache.get('1')
+        assert calls == ['1', '1', '1']
+
+    def test_error_shared(self):
+        def fetch(tenant_id):
+            raise ConnectionError('нет связи')
+
+        cache = StatusCache(fetch)
+        update = MockUpdate(5)
+        StatusCommands(cache, [(5, '1')]).status(update, None)
+        assert update.effective_message.replies == [
+            'Не удалось получить статусы, попробуйте позже'
+        ]
+        assert not cache.flights, 'Завершенный запрос не должен оставаться'
+
+    def test_commands(self):
+        cache = StatusCache(lambda tenant_id: [RECORD])
+        commands = StatusCommands(cache, [(5, '1')])
+        update = MockUpdate(5)
+        commands.status(update, None)
+        commands.refresh(update, None)
+        stranger = MockUpdate(6)
+        commands.status(stranger, None)
+        text = format_statuses([RECORD])
+        assert update.effective_message.replies == [text, text]
+        assert homework.HOMEWORK_STATUSES['approved'] in text
+        assert stranger.effective_message.replies == [
+            'Чат не подключен к боту'
+        ]
+
+    def test_refresh_burst(self):
+        calls = []
+        polls = []
+        known = {'1': {'1': 'approved'}}
+        release = threading.Event()
+
+        def fetch(tenant_id):
+            calls.append(tenant_id)
+            release.wait(5)
+            return [RECORD]
+
+        clock = Clock()
+        cache = StatusCache(fetch, clock=clock, known=known.get)
+        commands = StatusCommands(
+            cache, [(5, '1')], refresh_min_age=30, on_refresh=polls.append
+        )
+
+        def burst():
+            threads = [
+                threading.Thread(
+                    target=commands.refresh, args=(MockUpdate(5), None)
+                )
+                for _ in range(10)
+            ]
+            for thread in threads:
+                thread.start()
+            while len(calls) < expected:
+                time.sleep(0.001)
+            time.sleep(0.05)
+            release.set()
+            for thread in threads:
+                thread.join()
+            release.clear()
+
+        expected = 1
+        burst()
+        assert calls == ['1'] and polls == [], (
+            'Серия /refresh без новых статусов должна стоить одного '
+            'запроса к API'
+        )
+        clock.now = 60
+        known['1'] = {'1': 'reviewing'}
+        expected = 2
+        burst()
+        assert calls == ['1', '1'] and polls == ['1'], (
+            'Новые статусы должны вызывать один внеочередной опрос '
+            'на всю серию /refresh'
+        )
+
+    def test_fetch_statuses(self, monkeypatch):
+        requested = []
+
+        def mock_request_api(headers, current_timestamp, client=None):
+            requested.append(current_timestamp)
+            return {'homeworks': [], 'current_date': 1}
+
+        monkeypatch.setattr(homework, 'request_api', mock_request_api)
+        assert fetch_statuses({}) == []
+        assert requested == [0], (
+            'Для /status нужны все работы, начиная с from_date=0'
+        )
@@ -0,0 +1,166 @@
+import json
+import os
+import runpy
+
+import pytest
+
+import config
+import homework
+from config import (ConfigWatcher, DEFAULT_STATUSES, apply_globals,
+                    diff_tenants, read_config, read_env)
+from scheduler import AdaptiveScheduler
+from tenants import Tenant
+
+ENV = {
+    'PRACTICUM_TOKEN': 'practicum', 'TELEGRAM_TOKEN': '123:telegram',
+    'TELEGRAM_CHAT_ID': '42',
+}
+
+
+@pytest.fixture
+def restore_homework(monkeypatch):
+    for name in ('HOMEWORK_STATUSES', 'VALIDATOR', 'RETRY_TIME',
+                 'PRACTICUM_TOKEN', 'HEADERS', 'PROCESS_ENV_KEYS'):
+        monkeypatch.setattr(homework, name, getattr(homework, name))
+
+
+class TestReadConfig:
+
+    def test_env_defaults(self):
+        config = read_config(dict(ENV), config_file=None)
+        assert config.statuses == DEFAULT_STATUSES
+        assert config.retry_time == homework.RETRY_TIME
+        assert [
+            (tenant.tenant_id, tenant.practicum_token)
+            for tenant in config.tenants
+        ] == [('42', 'practicum')], (
+            'Проверьте, что без TENANTS_FILE студент берется из окружения'
+        )
+
+    def test_config_file(self, tmp_path):
+        config_file = tmp_path / 'config.json'
+        config_file.write_text(json.dumps({
+            'retry_time': 300,
+            'homework_statuses': {'approved': 'Принято'},
+        }))
+        tenants_file = tmp_path / 'tenants.json'
+        tenants_file.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'b', 'chat_id': 2},
+        ]))
+        config = read_config(
+            dict(ENV, TENANTS_FILE=str(tenants_file)), str(config_file)
+        )
+        assert config.retry_time == 300
+        assert config.statuses == {'approved': 'Принято'}, (
+            'Проверьте, что тексты статусов берутся из CONFIG_FILE'
+        )
+        assert [tenant.tenant_id for tenant in config.tenants] == ['1', '2']
+
+    def test_process_env_precedence(self, monkeypatch, tmp_path):
+        dotenv = tmp_path / '.env'
+        dotenv.write_text(
+            'PRACTICUM_TOKEN=from_file\nTELEGRAM_TOKEN=123:from_file\n'
+        )
+        monkeypatch.setattr(config, 'find_dotenv', lambda: str(dotenv))
+        monkeypatch.setattr(
+            homework, 'PROCESS_ENV_KEYS', frozenset(['PRACTICUM_TOKEN'])
+        )
+        monkeypatch.setenv('PRACTICUM_TOKEN', 'from_process')
+        monkeypatch.setenv('TELEGRAM_TOKEN', '123:loaded_at_start')
+        env = read_env()
+        assert env['PRACTICUM_TOKEN'] == 'from_process', (
+            'Проверьте, что переменные процесса важнее .env'
+        )
+        assert env['TELEGRAM_TOKEN'] == '123:from_file', (
+            'Проверьте, что правки .env подхватываются для переменных, '
+            'заданных только в .env'
+        )
+
+    @pytest.mark.parametrize('settings', [
+        [], {'homework_statuses': []}, {'homework_statuses': {'a': 1}},
+        {'retry_time': 0},
+    ])
+    def test_invalid(self, tmp_path, settings):
+        config_file = tmp_path / 'config.json'
+        config_file.write_text(json.dumps(settings))
+        with pytest.raises((TypeError, ValueError)):
+            read_config(dict(ENV), str(config_file))
+
+
+class TestApply:
+
+    def test_apply_globals(self, restore_homework):
+        config = read_config(
+            dict(ENV, PRACTICUM_TOKEN='rotated', RETRY_TIME='300'),
+            config_file=None
+        )
+        config.statuses = {'approved': 'Принято'}
+        changed = apply_globals(config)
+        assert changed == [
+            'HOMEWORK_STATUSES', 'RETRY_TIME', 'PRACTICUM_TOKEN'
+        ]
+        assert homework.HEADERS == {'Authorization': 'OAuth rotated'}, (
+            'Проверьте, что новый токен попадает в заголовки запроса'
+        )
+        assert homework.VALIDATOR.message(
+            {'homework_name': 'hw', 'status': 'approved'}
+        ).endswith('Принято'), (
+            'Проверьте, что новые тексты статусов попадают в сообщения'
+        )
+        assert apply_globals(config) == [], (
+            'Проверьте, что неизменившиеся настройки не применяются заново'
+        )
+
+    def test_diff_tenants(self):
+        old = {'1': Tenant('a', 1), '2': Tenant('b', 2)}
+        new = {'1': Tenant('a', 1), '2': Tenant('c', 2), '3': Tenant('d', 3)}
+        assert diff_tenants(old, new) == ['2'], (
+            'Проверьте, что изменившимися считаются студенты с новым '
+            'токеном или чатом'
+        )
+
+
+class TestConfigWatcher:
+
+    def test_check(self, tmp_path):
+        path = tmp_path / 'config.json'
+        path.write_text('{}')
+        watcher = ConfigWatcher(None, paths=[str(path)], interval=0)
+        assert not watcher.check()
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert watcher.check(), 'Проверьте, что изменение файла замечается'
+        assert not watcher.check()
+        path.unlink()
+        assert watcher.check(), 'Проверьте, что удаление файла замечается'
+        assert watcher.start() is None, (
+            'Проверьте, что при нулевом интервале слежение не запускается'
+        )
+
+
+class TestEntryPoint:
+
+    def test_script_reloads_imported_module(self, monkeypatch,
+                                            restore_homework):
+        schedulers = []
+
+        def mock_main():
+            scheduler = AdaptiveScheduler(homework.RETRY_TIME)
+            monkeypatch.setenv('RETRY_TIME', str(homework.RETRY_TIME + 60))
+            homework.reload_config(scheduler)
+            schedulers.append(scheduler)
+
+        monkeypatch.setattr(homework, 'main', mock_main)
+        retry_time = homework.RETRY_TIME
+        script = runpy.run_path(homework.__file__, run_name='__main__')
+        assert len(schedulers) == 1, (
+            'Проверьте, что запуск homework.py вызывает main() '
+            'импортированного модуля homework'
+        )
+        assert homework.RETRY_TIME == retry_time + 60 and (
+            schedulers[0].base == retry_time + 60
+        ), 'Проверьте, что перечитанные настройки доходят до цикла опроса'
+        assert script['PROCESS_ENV_KEYS'] is homework.PROCESS_ENV_KEYS, (
+            'Проверьте, что переменные процесса снимаются до load_dotenv()'
+        )
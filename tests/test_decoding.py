@@ -0,0 +1,72 @@
+import json
+from http import HTTPStatus
+
+import pytest
+import requests
+
+from decoding import HomeworkStream, loads, response_json
+
+
+def make_document(count):
+    return json.dumps({
+        'current_date': 5,
+        'homeworks': [
+            {'id': index, 'homework_name': f'hw{index}', 'status': 'approved',
+             'reviewer_comment': 'Отлично' * index,
+             'date_updated': '2022-01-01T00:00:00Z'}
+            for index in range(count)
+        ],
+    }, ensure_ascii=False).encode()
+
+
+class MockStreamResponse:
+
+    def __init__(self, body, **kwargs):
+        self.body = body
+        self.status_code = HTTPStatus.OK
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), 7):
+            yield self.body[start:start + 7]
+
+
+class TestDecoding:
+
+    @pytest.mark.parametrize('size', [1, 3, 64, 100000])
+    def test_stream_chunks(self, size):
+        document = make_document(50)
+        chunks = [
+            document[start:start + size]
+            for start in range(0, len(document), size)
+        ]
+        stream = HomeworkStream(chunks)
+        homeworks = list(stream)
+        assert [hw['id'] for hw in homeworks] == list(range(50)), (
+            'Проверьте, что работы разбираются при любом делении на части'
+        )
+        assert stream.envelope == {'current_date': 5, 'homeworks': []}
+
+    def test_loads_and_fallback(self):
+        assert loads(b'{"a": 1}') == {'a': 1}
+
+        class JSONOnly:
+            def json(self):
+                return {'b': 2}
+
+        assert response_json(JSONOnly()) == {'b': 2}
+
+    def test_request_api_stream(self, monkeypatch):
+        import homework
+
+        def mock_get(url, **kwargs):
+            assert kwargs['stream'], 'Проверьте, что запрос потоковый'
+            return MockStreamResponse(make_document(3))
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        answer = homework.request_api(homework.HEADERS, 0, stream=True)
+        assert answer['current_date'] == 5
+        assert answer['homeworks'][2] == {
+            'id': 2, 'homework_name': 'hw2', 'status': 'approved',
+            'date_updated': '2022-01-01T00:00:00Z'
+        }, 'Проверьте, что в потоковом режиме остаются только нужные поля'
+        assert homework.check_response(answer)
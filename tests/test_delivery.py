@@ -0,0 +1,86 @@
+import asyncio
+
+from delivery import Coalescer, DeliveryQueue, TokenBucket
+from tests.fixtures.doubles import Clock
+
+
+class RetryAfter(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__('Flood control exceeded')
+        self.retry_after = retry_after
+
+
+class TestTokenBucket:
+
+    def test_reserve_and_pause(self):
+        clock = Clock()
+        bucket = TokenBucket(2, capacity=2, clock=clock)
+        assert [bucket.reserve() for _ in range(3)] == [0, 0, 0.5], (
+            'Проверьте, что сверх запаса токены выдаются с ожиданием'
+        )
+        clock.now += 10
+        assert bucket.reserve() == 0
+        bucket.pause(3)
+        assert bucket.reserve() == 3.5
+
+
+class TestDeliveryQueue:
+
+    def test_order_and_retry_after(self):
+        sent = []
+        failures = [RetryAfter(0.01)]
+
+        def send(chat_id, text):
+            if failures:
+                raise failures.pop()
+            sent.append((chat_id, text))
+
+        delivery = DeliveryQueue(send, workers=2, chat_rate=1000)
+
+        async def deliver_all():
+            workers = asyncio.ensure_future(delivery.run())
+            for index in range(5):
+                delivery.put(1, str(index))
+            await delivery.join()
+            workers.cancel()
+
+        asyncio.run(deliver_all())
+        assert sent == [(1, str(index)) for index in range(5)], (
+            'Проверьте, что после 429 сообщение отправляется повторно '
+            'и порядок сообщений чата сохраняется'
+        )
+
+
+class TestCoalescer:
+
+    def test_merge_within_window(self):
+        sent = []
+        coalescer = Coalescer(
+            lambda chat_id, text, keys: sent.append((chat_id, text, keys)),
+            window=0.05
+        )
+
+        async def notify():
+            coalescer.add(1, 'a', 'a: reviewing', 'k1')
+            coalescer.add(1, 'b', 'b: rejected', 'k2')
+            coalescer.add(2, 'a', 'other chat', 'k3')
+            coalescer.add(1, 'a', 'a: approved', 'k4')
+            assert not sent, 'Проверьте, что уведомления ждут конца окна'
+            await asyncio.sleep(0.1)
+
+        asyncio.run(notify())
+        assert sorted(sent) == [
+            (1, 'b: rejected\n\na: approved', ['k2', 'k1', 'k4']),
+            (2, 'other chat', ['k3'])
+        ], (
+            'Проверьте, что уведомления чата объединяются, а устаревший '
+            'статус работы заменяется новым'
+        )
+
+    def test_split_by_limit(self):
+        coalescer = Coalescer(None, limit=10)
+        notifications = [('12345', [1]), ('123', [2]), ('1234567', [3])]
+        assert coalescer.merge(notifications) == [
+            ('12345\n\n123', [1, 2]), ('1234567', [3])
+        ]
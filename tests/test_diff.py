@@ -0,0 +1,27 @@
+from diff import diff_homeworks
+
+
+class TestDiff:
+
+    def test_only_transitions(self):
+        homeworks = [
+            {'id': 1, 'homework_name': 'a', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'b', 'status': 'reviewing'},
+            {'id': 3, 'homework_name': 'c', 'status': 'rejected'},
+        ]
+        known = {'1': 'reviewing', '2': 'reviewing'}
+        changed = diff_homeworks(homeworks, known)
+        assert [hw['id'] for hw in changed] == [1, 3], (
+            'Проверьте, что возвращаются все работы с изменившимся '
+            'статусом, а не только первая'
+        )
+
+    def test_duplicates_keep_latest(self):
+        homeworks = [
+            {'id': 1, 'status': 'reviewing',
+             'date_updated': '2022-01-01T10:00:00Z'},
+            {'id': 1, 'status': 'approved',
+             'date_updated': '2022-01-02T10:00:00Z'},
+        ]
+        changed = diff_homeworks(homeworks, {'1': 'reviewing'})
+        assert [hw['status'] for hw in changed] == ['approved']
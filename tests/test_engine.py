@@ -0,0 +1,307 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+import homework
+from engine import PollingEngine
+from exceptions import ResponseEmptyHW, TokenMissing
+from state import StateStore
+from tenants import Tenant, load_tenants
+from tests.fixtures.doubles import MockBot
+
+
+class TestEngine:
+
+    def test_poll_all_tenants(self, monkeypatch, random_timestamp, tmp_path):
+        requested = []
+
+        def mock_request_api(headers, current_timestamp, client=None,
+                             timeout=None, stream=False):
+            requested.append(headers['Authorization'])
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': random_timestamp
+            }
+
+        monkeypatch.setattr(homework, 'request_api', mock_request_api)
+        tenants = [Tenant(f'token{i}', i) for i in range(1, 6)]
+        bot = MockBot()
+        store = StateStore(tmp_path / 'state.db')
+        engine = PollingEngine(
+            tenants, bot, concurrency=2, store=store, coalesce_window=0
+        )
+
+        async def poll_all():
+            await asyncio.gather(*(
+                engine.poll_tenant(tenant) for tenant in tenants
+            ))
+            engine.coalescer.flush_all()
+            await engine.delivery.join()
+
+        async def poll_twice():
+            engine.semaphore = asyncio.Semaphore(engine.concurrency)
+            workers = asyncio.ensure_future(engine.delivery.run())
+            await poll_all()
+            first = list(bot.sent)
+            await poll_all()
+            workers.cancel()
+            return first
+
+        first = asyncio.run(poll_twice())
+        assert sorted(requested) == sorted(
+            [f'OAuth token{i}' for i in range(1, 6)] * 2
+        ), 'Проверьте, что движок опрашивает API с токеном каждого студента'
+        assert sorted(chat for chat, _ in first) == [
+            '1', '2', '3', '4', '5'
+        ], 'Проверьте, что сообщение уходит в чат каждого студента'
+        assert len(bot.sent) == 5, (
+            'Проверьте, что неизменившийся статус не отправляется повторно'
+        )
+
+    def test_watermark_from_current_date(self, monkeypatch, tmp_path):
+        homework_record = {'id': 1, 'homework_name': 'hw',
+                           'status': 'approved', 'date_updated': '1'}
+        answers = [
+            {'homeworks': [], 'current_date': 1000},
+            {'homeworks': [homework_record], 'current_date': 2000},
+            {'homeworks': [homework_record], 'current_date': 2030},
+            {'homeworks': [homework_record]},
+        ]
+        requested = []
+
+        def mock_request_api(headers, current_timestamp, client=None,
+                             timeout=None, stream=False):
+            requested.append(current_timestamp)
+            return answers[len(requested) - 1]
+
+        monkeypatch.setattr(homework, 'request_api', mock_request_api)
+        monkeypatch.setattr(homework, 'WATERMARK_OVERLAP', 60)
+        tenant = Tenant('token', 1)
+        store = StateStore(tmp_path / 'state.db')
+        engine = PollingEngine([tenant], MockBot(), store=store)
+
+        async def poll_all():
+            engine.semaphore = asyncio.Semaphore(1)
+            with pytest.raises(ResponseEmptyHW):
+                await engine.poll_tenant(tenant)
+            return [
+                await engine.poll_tenant(tenant) for _ in range(3)
+            ]
+
+        started = time.time()
+        added = asyncio.run(poll_all())
+        assert requested[1:3] == [940, 1940], (
+            'Проверьте, что отметка сдвигается по current_date ответа '
+            'с отступом, в том числе по ответу без работ'
+        )
+        assert added == [1, 0, 0], (
+            'Проверьте, что работы из перекрытия окон не уведомляются '
+            'повторно'
+        )
+        assert store.get_watermark('1') >= int(started) - 60, (
+            'Проверьте, что без current_date отметка идет от времени запроса'
+        )
+
+    def test_timeout_from_next_deadline(self, monkeypatch, tmp_path):
+        engine = PollingEngine(
+            [Tenant('token', 1)], MockBot(),
+            store=StateStore(tmp_path / 'state.db')
+        )
+        monkeypatch.setattr(engine.scheduler, 'interval', lambda _: 60)
+        monkeypatch.setattr(homework, 'API_CONNECT_TIMEOUT', 5)
+        monkeypatch.setattr(homework, 'API_READ_TIMEOUT', 30)
+        assert engine.timeout('1') == (5, 30)
+        engine.due['1'] = time.monotonic() - 40
+        connect, read = engine.timeout('1')
+        assert connect == 5 and 9 < read <= 10, (
+            'Проверьте, что опоздавшему опросу достается остаток времени '
+            'до следующего опроса'
+        )
+        engine.due['1'] = time.monotonic() - 120
+        assert engine.timeout('1') == (1, 1), (
+            'Проверьте, что таймаут не опускается ниже API_MIN_TIMEOUT'
+        )
+        assert '1' not in engine.due
+
+    def test_dispatch_by_deadlines(self, monkeypatch, tmp_path):
+        polls = []
+
+        def mock_request_api(headers, current_timestamp, client=None,
+                             timeout=None, stream=False):
+            polls.append(headers['Authorization'])
+            return {'homeworks': [], 'current_date': 0}
+
+        monkeypatch.setattr(homework, 'request_api', mock_request_api)
+        tenants = [Tenant(f'token{i}', i) for i in range(1, 4)]
+        engine = PollingEngine(
+            tenants, MockBot(), retry_time=0.05,
+            store=StateStore(tmp_path / 'state.db')
+        )
+
+        async def run_briefly():
+            try:
+                await asyncio.wait_for(engine.run(), 0.5)
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(run_briefly())
+        assert len(set(polls)) == 3 and len(polls) >= 6, (
+            'Проверьте, что диспетчер повторно опрашивает каждого студента '
+            'по наступлении срока'
+        )
+
+    def test_poll_now_and_stop(self, monkeypatch, tmp_path):
+        polls = []
+
+        def mock_request_api(headers, current_timestamp, client=None,
+                             timeout=None, stream=False):
+            polls.append(time.monotonic())
+            return {'homeworks': [], 'current_date': 0}
+
+        monkeypatch.setattr(homework, 'request_api', mock_request_api)
+        engine = PollingEngine(
+            [Tenant('token', 1)], MockBot(), retry_time=600,
+            store=StateStore(tmp_path / 'state.db')
+        )
+
+        async def refresh_and_stop():
+            runner = asyncio.ensure_future(engine.run())
+            while not polls:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            threading.Thread(target=engine.request_poll, args=('1',)).start()
+            while len(polls) < 2:
+                await asyncio.sleep(0.01)
+            engine.stop()
+            await asyncio.wait_for(runner, 5)
+
+        asyncio.run(asyncio.wait_for(refresh_and_stop(), 10))
+        assert len(polls) == 2, (
+            'Проверьте, что внеочередной опрос не ждет интервала'
+        )
+
+    def test_set_tenants(self, tmp_path):
+        store = StateStore(tmp_path / 'state.db')
+        engine = PollingEngine(
+            [Tenant('a', 1), Tenant('b', 2)], MockBot(), store=store
+        )
+        other = StateStore(tmp_path / 'state.db')
+        other.set_watermark('3', 42)
+        other.set_status('3', 'hw', 'approved')
+        other.close()
+
+        async def rebalance():
+            engine.schedule('1', 0)
+            engine.schedule('2', 0)
+            return await engine.set_tenants([Tenant('b', 2), Tenant('c', 3)])
+
+        added, removed = asyncio.run(rebalance())
+        assert (added, removed) == (['3'], ['1'])
+        assert '1' not in engine.deadlines and '3' in engine.deadlines, (
+            'Проверьте, что расписание обновляется только для разницы'
+        )
+        assert store.get_watermark('3') == 42 and store.get_statuses(
+            '3'
+        ) == {'hw': 'approved'}, (
+            'Состояние добавленного студента должно читаться из базы'
+        )
+        store.close()
+
+    def test_set_tenants_releases_notifications(self, tmp_path):
+        store = StateStore(tmp_path / 'state.db')
+        bot = MockBot()
+        engine = PollingEngine(
+            [Tenant('a', 1), Tenant('b', 2)], bot, store=store,
+            coalesce_window=60
+        )
+        engine.outbox.add_many([
+            ('a:1', '1', 'hw1', 'Первый'), ('a:2', '1', 'hw2', 'Второй'),
+            ('b:1', '2', 'hw1', 'Третий'),
+        ])
+
+        async def rebalance():
+            first, second, third = engine.outbox.pending()
+            engine.enqueue(first)
+            engine.enqueue(third)
+            engine.in_flight.add(second.message_key)
+            engine.delivery.put('1', second.text, [second.message_key])
+            await engine.set_tenants([Tenant('b', 2)])
+            engine.coalescer.flush_all()
+            workers = asyncio.ensure_future(engine.delivery.run())
+            await engine.delivery.join()
+            workers.cancel()
+
+        asyncio.run(rebalance())
+        assert [chat for chat, _ in bot.sent] == ['2'], (
+            'Проверьте, что уведомления отданного студента не отправляются '
+            'старым процессом'
+        )
+        assert sorted(
+            message.message_key for message in engine.outbox.pending()
+        ) == ['a:1', 'a:2'] and engine.in_flight == set(), (
+            'Проверьте, что снятые уведомления остаются в outbox '
+            'для нового владельца'
+        )
+        store.close()
+
+    def test_apply_config(self, monkeypatch, tmp_path):
+        from config import read_config
+
+        for name in ('HOMEWORK_STATUSES', 'VALIDATOR', 'RETRY_TIME',
+                     'PRACTICUM_TOKEN', 'HEADERS'):
+            monkeypatch.setattr(homework, name, getattr(homework, name))
+        tenants_file = tmp_path / 'tenants.json'
+        tenants_file.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'rotated', 'chat_id': 2},
+            {'practicum_token': 'c', 'chat_id': 3},
+        ]))
+        config = read_config({
+            'TENANTS_FILE': str(tenants_file), 'RETRY_TIME': '300',
+            'PRACTICUM_TOKEN': homework.PRACTICUM_TOKEN,
+        }, None)
+        config.statuses = dict(config.statuses, approved='Принято')
+        store = StateStore(tmp_path / 'state.db')
+        engine = PollingEngine(
+            [Tenant('a', 1), Tenant('b', 2), Tenant('d', 4)], MockBot(),
+            store=store
+        )
+        engine.cache.entries = {'1': (0, {}), '2': (0, {})}
+
+        async def reload():
+            for tenant_id in ('1', '2', '4'):
+                engine.schedule(tenant_id, 100)
+            deadline = engine.deadlines.deadline('1')
+            changed = await engine.apply_config(config)
+            return changed, deadline
+
+        changed, deadline = asyncio.run(reload())
+        assert changed == ['HOMEWORK_STATUSES', 'RETRY_TIME', 'студенты']
+        assert engine.deadlines.deadline('1') == deadline, (
+            'Проверьте, что неизменившиеся студенты не перепланируются'
+        )
+        assert '3' in engine.deadlines and '4' not in engine.deadlines, (
+            'Проверьте, что добавляется и исключается только разница'
+        )
+        assert engine.tenants['2'].practicum_token == 'rotated' and (
+            list(engine.cache.entries) == ['1']
+        ), 'Проверьте, что у студента с новым токеном сбрасывается кэш'
+        assert engine.scheduler.base == 300 and engine.retry_time == 300
+        assert homework.HOMEWORK_STATUSES['approved'] == 'Принято'
+        store.close()
+
+    def test_load_tenants(self, tmp_path):
+        file_path = tmp_path / 'tenants.json'
+        file_path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'b', 'chat_id': 2, 'id': 'student'},
+        ]))
+        tenants = load_tenants(file_path)
+        assert [t.tenant_id for t in tenants] == ['1', 'student']
+
+        file_path.write_text(json.dumps([{'chat_id': 1}]))
+        with pytest.raises(TokenMissing):
+            load_tenants(file_path)
@@ -0,0 +1,162 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from urllib3.exceptions import EmptyPoolError
+
+import homework
+import http_client
+from exceptions import ResponseWrongStatus
+from http_client import HedgedClient, PooledClient
+from metrics import REGISTRY
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"homeworks": [], "current_date": 0}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ErrorHandler(JSONHandler):
+
+    def do_GET(self):
+        body = b'{"code": "internal_error"}' * 1000
+        self.send_response(500)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(handler):
+    server = HTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+@pytest.fixture
+def local_url():
+    server = serve(JSONHandler)
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def error_url(monkeypatch):
+    server = serve(ErrorHandler)
+    monkeypatch.setattr(homework, 'ENDPOINT',
+                        f'http://127.0.0.1:{server.server_port}/')
+    yield homework.ENDPOINT
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def short_pool_timeout(monkeypatch):
+    monkeypatch.setattr(http_client.PoolTimeoutMixin, 'pool_timeout', 0.5)
+
+
+class TestPooledClient:
+
+    def test_connection_reused(self, local_url):
+        client = PooledClient(pool_size=1)
+        first = client.get(local_url, params={'from_date': 0})
+        second = client.get(local_url, params={'from_date': 0})
+        client.close()
+
+        assert first.json()['homeworks'] == []
+        assert not first.timing.reused and first.timing.connect > 0, (
+            'Проверьте, что для первого запроса замеряется время соединения'
+        )
+        assert second.timing.reused, (
+            'Проверьте, что второй запрос переиспользует соединение из пула'
+        )
+        assert 0 < second.timing.ttfb <= second.timing.total, (
+            'Проверьте, что время до первого байта замеряется'
+        )
+        rendered = REGISTRY.render()
+        assert 'hw_bot_http_request_seconds_count{phase="ttfb"}' in rendered, (
+            'Проверьте, что времена запросов попадают в метрики'
+        )
+        assert 'hw_bot_http_requests_total{reused="true"}' in rendered
+
+    def test_pool_wait_bounded(self, local_url, short_pool_timeout):
+        client = PooledClient(pool_size=1)
+        held = client.get(local_url, stream=True)
+        started = time.monotonic()
+        with pytest.raises(EmptyPoolError):
+            client.get(local_url)
+        assert time.monotonic() - started < 5, (
+            'Проверьте, что ожидание свободного соединения ограничено'
+        )
+        held.close()
+        client.close()
+
+    def test_error_response_released(self, error_url, short_pool_timeout):
+        client = PooledClient(pool_size=1)
+        for _ in range(2):
+            with pytest.raises(ResponseWrongStatus):
+                homework.request_api({}, 0, client=client, stream=True)
+        client.close()
+
+
+class SlowFirstClient:
+
+    def __init__(self):
+        self.calls = 0
+        self.closed = []
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        call = self.calls
+        if call == 1:
+            time.sleep(0.3)
+        return SlowResponse(call, self.closed)
+
+    def close(self):
+        pass
+
+
+class SlowResponse:
+
+    def __init__(self, call, closed):
+        self.call = call
+        self.closed = closed
+
+    def close(self):
+        self.closed.append(self.call)
+
+
+class TestHedgedClient:
+
+    def test_hedge_after_p95(self):
+        client = HedgedClient(SlowFirstClient(), workers=2)
+        assert client.hedge_delay() is None, (
+            'Проверьте, что без истории задержек запрос не дублируется'
+        )
+        client.latencies.extend([0.01] * 50)
+
+        started = time.perf_counter()
+        response = client.get('url')
+        elapsed = time.perf_counter() - started
+        assert response.call == 2 and elapsed < 0.25, (
+            'Проверьте, что при долгом ответе используется '
+            'дублирующий запрос'
+        )
+        time.sleep(0.4)
+        assert client.client.closed == [1], (
+            'Проверьте, что опоздавший ответ закрывается'
+        )
+        client.close()
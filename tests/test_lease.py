@@ -0,0 +1,106 @@
+import asyncio
+import subprocess
+import sys
+
+import homework
+from engine import PollingEngine
+from lease import Lease
+from state import StateStore
+from tenants import Tenant
+from tests.fixtures.doubles import Clock, MockBot
+
+
+class TestLease:
+
+    def test_single_holder_and_expiry(self, tmp_path):
+        clock = Clock(1000)
+        first = Lease('tenant:1', tmp_path / 'state.db', ttl=15, clock=clock)
+        second = Lease('tenant:1', tmp_path / 'state.db', ttl=15, clock=clock)
+        assert first.acquire() and not second.acquire(), (
+            'Аренду должен держать только один процесс'
+        )
+        clock.now += 10
+        assert first.acquire() and not second.acquire(), (
+            'Продление должно сохранять аренду за держателем'
+        )
+        clock.now += 20
+        assert second.acquire() and not first.acquire(), (
+            'Непродленная аренда должна переходить резерву'
+        )
+        second.close()
+        assert first.acquire(), 'Освобожденную аренду можно сразу получить'
+        first.close()
+
+    def test_dead_holder_failover(self, tmp_path):
+        holder = Lease('tenant:1', tmp_path / 'state.db', ttl=600)
+        standby = Lease('tenant:1', tmp_path / 'state.db', ttl=600)
+        assert holder.acquire()
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        holder.connection.execute(
+            'UPDATE leases SET pid = ? WHERE name = ?',
+            (process.pid, 'tenant:1')
+        )
+        assert standby.acquire(), (
+            'Аренда завершившегося процесса должна перехватываться сразу'
+        )
+        standby.close()
+        holder.connection.close()
+
+    def test_engine_standby(self, monkeypatch, tmp_path):
+        polls = []
+
+        def mock_request_api(headers, current_timestamp, client=None,
+                             timeout=None, stream=False):
+            polls.append(headers['Authorization'])
+            return {'homeworks': [], 'current_date': 0}
+
+        monkeypatch.setattr(homework, 'request_api', mock_request_api)
+        holder = Lease('engine', tmp_path / 'state.db', ttl=0.3)
+        assert holder.acquire()
+        engine = PollingEngine(
+            [Tenant('token', 1)], MockBot(),
+            store=StateStore(tmp_path / 'state.db'),
+            lease=Lease('engine', tmp_path / 'state.db', ttl=0.3)
+        )
+
+        async def failover():
+            runner = asyncio.ensure_future(engine.run())
+            await asyncio.sleep(0.3)
+            standby_polls = len(polls)
+            holder.close()
+            while not polls:
+                await asyncio.sleep(0.01)
+            engine.stop()
+            await runner
+            return standby_polls
+
+        assert asyncio.run(asyncio.wait_for(failover(), 10)) == 0, (
+            'Резервный движок не должен опрашивать API'
+        )
+        assert polls == ['OAuth token'], (
+            'После освобождения аренды опрос должен перейти резерву'
+        )
+
+    def test_commands_stopped_on_standby(self, monkeypatch):
+        import commands
+
+        class MockUpdater:
+            stopped = False
+
+            def stop(self):
+                self.stopped = True
+
+        monkeypatch.setattr(commands, 'BOT_COMMANDS', True)
+        monkeypatch.setattr(commands, 'start_commands',
+                            lambda bot, handlers: MockUpdater())
+        monkeypatch.setattr(homework, 'check_tokens', lambda: True)
+        updater = homework.ensure_commands(None, MockBot(), None)
+        assert homework.ensure_commands(updater, MockBot(), None) is updater
+        assert homework.stop_commands(updater) is None and updater.stopped, (
+            'В резерве прием команд должен останавливаться, иначе Telegram '
+            'ответит 409 на getUpdates'
+        )
+        assert isinstance(
+            homework.ensure_commands(None, MockBot(), None), MockUpdater
+        ), 'Проверьте, что после резерва прием команд запускается заново'
@@ -0,0 +1,109 @@
+import io
+import json
+import logging
+import queue
+
+from logs import (SAMPLE, JsonFormatter, LazyQueueHandler, SamplingFilter,
+                  setup_logging, stop_listener)
+
+
+def make_record(message, level=logging.INFO, args=(), sample=True):
+    record = logging.LogRecord(
+        'hw_bot', level, __file__, 1, message, args, None
+    )
+    record.sample = sample
+    return record
+
+
+class TestLogs:
+
+    def test_sampling(self):
+        sampler = SamplingFilter(every=3)
+        passed = [
+            sampler.filter(make_record('Ответ от API получен'))
+            for _ in range(7)
+        ]
+        assert passed == [True, False, False, True, False, False, True], (
+            'Повторяющиеся записи INFO должны прореживаться'
+        )
+        assert all(
+            sampler.filter(make_record('Сбой', logging.ERROR))
+            for _ in range(5)
+        ), 'Ошибки не должны прореживаться'
+        assert all(
+            sampler.filter(make_record('Аренда %s %s', sample=False))
+            for _ in range(5)
+        ), 'Неотмеченные записи INFO не должны прореживаться'
+
+    def test_sampling_keys_bounded(self):
+        sampler = SamplingFilter(every=3, size=2)
+        sampler.filter(make_record('Первое'))
+        sampler.filter(make_record('Второе'))
+        sampler.filter(make_record('Первое'))
+        sampler.filter(make_record('Третье'))
+        assert list(sampler.counts) == [
+            ('hw_bot', 'Первое'), ('hw_bot', 'Третье')
+        ], (
+            'Проверьте, что при переполнении забывается давно '
+            'не встречавшийся шаблон'
+        )
+
+    def test_lazy_formatting(self):
+        class Argument:
+            formatted = 0
+
+            def __str__(self):
+                Argument.formatted += 1
+                return 'значение'
+
+        handler = LazyQueueHandler(queue.Queue())
+        record = make_record('Значение %s', args=(Argument(),))
+        handler.handle(record)
+        assert Argument.formatted == 0, (
+            'Сообщение не должно форматироваться в вызывающем потоке'
+        )
+        assert handler.queue.get_nowait().getMessage() == 'Значение значение'
+
+    def test_json(self):
+        record = make_record('Опрос [%s] пропущен', args=('42',))
+        data = json.loads(JsonFormatter().format(record))
+        assert data['message'] == 'Опрос [42] пропущен'
+        assert data['level'] == 'INFO' and data['logger'] == 'hw_bot'
+
+    def test_setup(self):
+        stream = io.StringIO()
+        logger = logging.getLogger('hw_bot_test_logs')
+        logger.handlers = [logging.StreamHandler(stream)]
+        logger.setLevel(logging.INFO)
+        listener = setup_logging(
+            True, 'json', sample_every=2, names=('hw_bot_test_logs',),
+            config_file=None
+        )
+        assert setup_logging(
+            names=('hw_bot_test_logs',), config_file=None
+        ) is listener, 'Повторная настройка должна вернуть тот же слушатель'
+        try:
+            for index in range(4):
+                logger.info('Ответ от API получен %s', index, extra=SAMPLE)
+            logger.info('Аренда получена')
+            logger.info('Аренда получена')
+            logger.error('Сбой')
+        finally:
+            stop_listener(listener)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+        assert [line['message'] for line in lines] == [
+            'Ответ от API получен 0', 'Ответ от API получен 2',
+            'Аренда получена', 'Аренда получена', 'Сбой'
+        ], 'Записи должны писаться слушателем с прореживанием'
+        assert setup_logging(False, config_file=None) is None
+
+    def test_json_without_queue(self):
+        logger = logging.getLogger('hw_bot_test_plain')
+        handler = logging.StreamHandler(io.StringIO())
+        logger.handlers = [handler]
+        assert setup_logging(
+            False, 'json', names=('hw_bot_test_plain',), config_file=None
+        ) is None
+        assert isinstance(handler.formatter, JsonFormatter), (
+            'Проверьте, что LOG_FORMAT=json работает и без очереди'
+        )
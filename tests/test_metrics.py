@@ -0,0 +1,47 @@
+import pytest
+import requests
+
+from exceptions import StatusUnknown
+from metrics import (REGISTRY, STAGE_ERRORS, Histogram, start_server,
+                     timed)
+
+
+class TestMetrics:
+
+    def test_histogram_render(self):
+        histogram = Histogram('test_seconds', 'Тест', buckets=(0.1, 1))
+        histogram.observe(0.05, stage='a')
+        histogram.observe(0.5, stage='a')
+        histogram.observe(5, stage='a')
+        lines = histogram.render()
+        assert 'hw_bot_test_seconds_bucket{stage="a",le="0.1"} 1' in lines
+        assert 'hw_bot_test_seconds_bucket{stage="a",le="1"} 2' in lines
+        assert 'hw_bot_test_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+        assert 'hw_bot_test_seconds_count{stage="a"} 3' in lines
+
+    def test_timed_counts_exceptions(self):
+        @timed('test_stage')
+        def stage(fail):
+            if fail:
+                raise StatusUnknown('неизвестный статус')
+            return 'ok'
+
+        stage(False)
+        with pytest.raises(StatusUnknown):
+            stage(True)
+        key = (('exception', 'StatusUnknown'), ('stage', 'test_stage'))
+        assert STAGE_ERRORS.series[key] == 1, (
+            'Проверьте, что исключения этапа считаются по классам'
+        )
+
+    def test_server(self):
+        server = start_server(port=0)
+        port = server.server_address[1]
+        try:
+            response = requests.get(f'http://127.0.0.1:{port}/metrics')
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert response.status_code == 200
+        assert '# TYPE hw_bot_stage_seconds histogram' in response.text
+        assert REGISTRY.render().startswith(response.text.split('\n')[0])
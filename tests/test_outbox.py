@@ -0,0 +1,67 @@
+from outbox import Message, Outbox, message_key
+
+
+def make_message(index):
+    return Message(f'key{index}', '1', f'hw{index}', f'text{index}')
+
+
+class TestOutbox:
+
+    def test_dedup_and_replay(self, tmp_path):
+        db_path = tmp_path / 'state.db'
+        outbox = Outbox(db_path)
+        added = outbox.add_many([make_message(1), make_message(2)])
+        assert len(added) == 2
+        assert outbox.add_many([make_message(1)]) == [], (
+            'Проверьте, что уведомление с тем же ключом не записывается'
+        )
+        outbox.ack(['key1'])
+        outbox.close()
+
+        outbox = Outbox(db_path)
+        assert [m.message_key for m in outbox.pending()] == ['key2'], (
+            'Проверьте, что после перезапуска остаются только '
+            'неотправленные уведомления'
+        )
+        assert outbox.add_many([make_message(1)]) == [], (
+            'Проверьте, что отправленное уведомление не дублируется'
+        )
+
+    def test_drain_stops_on_error(self, tmp_path):
+        outbox = Outbox(tmp_path / 'state.db')
+        outbox.add_many([make_message(i) for i in range(3)])
+        sent = []
+
+        def send(chat_id, text):
+            if text == 'text1':
+                raise ConnectionError('Telegram недоступен')
+            sent.append(text)
+
+        assert not outbox.drain(send)
+        assert sent == ['text0']
+        assert [m.text for m in outbox.pending()] == ['text1', 'text2'], (
+            'Проверьте, что неотправленные уведомления сохраняют порядок'
+        )
+        assert outbox.drain(lambda chat_id, text: sent.append(text))
+        assert sent == ['text0', 'text1', 'text2']
+
+    def test_drain_own_chat(self, tmp_path):
+        outbox = Outbox(tmp_path / 'state.db')
+        outbox.add_many([
+            make_message(1), Message('other', '2', 'hw', 'чужое'),
+        ])
+        sent = []
+        assert outbox.drain(lambda chat_id, text: sent.append(chat_id), 1)
+        assert sent == ['1'], (
+            'Проверьте, что процесс отправляет только уведомления своего чата'
+        )
+        assert [m.message_key for m in outbox.pending()] == ['other'], (
+            'Уведомления других чатов должны остаться в outbox'
+        )
+
+    def test_message_key(self):
+        homework = {'id': 5, 'status': 'approved',
+                    'date_updated': '2022-01-01T00:00:00Z'}
+        assert message_key('1', homework) == (
+            '1:5:approved:2022-01-01T00:00:00Z'
+        )
@@ -0,0 +1,127 @@
+import gzip
+
+import pytest
+
+import homework
+from benchmarks.stubs import StubPracticum
+from exceptions import ResponseWrongStatus
+from http_client import PooledClient
+from replay import (Recording, RecordingClient, ReplayClient, load_recording,
+                    tenant_key)
+from tests.fixtures.doubles import Clock
+
+TOKEN = 'secret-token'
+HEADERS = {'Authorization': f'OAuth {TOKEN}'}
+
+
+@pytest.fixture
+def practicum(monkeypatch):
+    server = StubPracticum([TOKEN], homeworks=2, changes_per_sec=0).start()
+    monkeypatch.setattr(
+        homework, 'ENDPOINT', f'{server.url}/api/user_api/homework_statuses/'
+    )
+    yield server
+    server.stop()
+
+
+def record(path, count=2, stream=False):
+    client = RecordingClient(PooledClient(pool_size=1), str(path))
+    answers = [
+        homework.request_api(HEADERS, 0, client, stream=stream)
+        for _ in range(count)
+    ]
+    client.close()
+    return answers
+
+
+class TestRecordingClient:
+
+    def test_responses_recorded(self, practicum, tmp_path):
+        path = tmp_path / 'api.jsonl.gz'
+        record(path)
+        tenants = load_recording(str(path))
+        assert list(tenants) == [tenant_key(HEADERS)], (
+            'Проверьте, что ответы записываются по ключу студента'
+        )
+        entries = tenants[tenant_key(HEADERS)]
+        assert len(entries) == 2, 'Проверьте, что записан каждый ответ'
+        assert entries[0]['status'] == 200 and entries[0]['elapsed'] > 0, (
+            'Проверьте, что записываются код и длительность ответа'
+        )
+        assert entries[0]['from_date'] == 0, (
+            'Проверьте, что записывается from_date запроса'
+        )
+        with gzip.open(path, 'rt') as file:
+            assert HEADERS['Authorization'] not in file.read(), (
+                'Проверьте, что заголовок с токеном не попадает в запись'
+            )
+
+    def test_stream_recorded(self, practicum, tmp_path):
+        path = tmp_path / 'api.jsonl.gz'
+        answers = record(path, count=1, stream=True)
+        assert len(answers[0]['homeworks']) == 3, (
+            'Проверьте, что потоковый разбор работает при записи'
+        )
+        assert len(load_recording(str(path))[tenant_key(HEADERS)]) == 1, (
+            'Проверьте, что записывается и потоковый ответ'
+        )
+
+
+class TestReplay:
+
+    def test_replay_matches_recording(self, practicum, tmp_path):
+        path = tmp_path / 'api.jsonl.gz'
+        answers = record(path, count=1)
+        client = ReplayClient(Recording.load(str(path), speed=0))
+        assert homework.request_api(HEADERS, 0, client) == answers[0], (
+            'Проверьте, что воспроизводится записанный ответ'
+        )
+        assert homework.request_api(
+            HEADERS, 0, client, stream=True
+        )['homeworks'] == homework.request_api(
+            HEADERS, 0, client
+        )['homeworks'], (
+            'Проверьте, что записанный ответ разбирается и потоково'
+        )
+
+    def test_unknown_tenant(self, tmp_path):
+        client = ReplayClient(Recording({}, speed=0))
+        with pytest.raises(ResponseWrongStatus):
+            homework.request_api(HEADERS, 0, client)
+
+    def test_speed_follows_offsets(self):
+        clock = Clock()
+        entries = [
+            {'offset': 0, 'elapsed': 0.5, 'body': 'first'},
+            {'offset': 5, 'elapsed': 0.5, 'body': 'second'},
+        ]
+        recording = Recording({'key': entries}, speed=10, clock=clock)
+        clock.now = 0.4
+        assert recording.entry('key')['body'] == 'first', (
+            'Проверьте, что до смещения ответа отдается предыдущий'
+        )
+        clock.now = 0.6
+        assert recording.entry('key')['body'] == 'second', (
+            'Проверьте, что время записи ускоряется в speed раз'
+        )
+        clock.now = 100
+        assert recording.entry('key')['body'] == 'second', (
+            'Проверьте, что после конца записи отдается последний ответ'
+        )
+        assert recording.latency(entries[0]) == pytest.approx(0.05), (
+            'Проверьте, что задержка ответа ускоряется в speed раз'
+        )
+
+    def test_zero_speed_is_sequential(self):
+        entries = [
+            {'offset': 0, 'elapsed': 1, 'body': 'first'},
+            {'offset': 60, 'elapsed': 1, 'body': 'second'},
+        ]
+        recording = Recording({'key': entries}, speed=0)
+        bodies = [recording.entry('key')['body'] for _ in range(3)]
+        assert bodies == ['first', 'second', 'second'], (
+            'Проверьте, что без ускорения ответы отдаются по очереди'
+        )
+        assert recording.latency(entries[0]) == 0, (
+            'Проверьте, что без ускорения ответы отдаются без задержки'
+        )
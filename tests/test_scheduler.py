@@ -0,0 +1,105 @@
+import threading
+import time
+
+from scheduler import AdaptiveScheduler, DeadlineQueue, PollTrigger
+from tests.fixtures.doubles import Clock
+
+
+class TestAdaptiveScheduler:
+
+    def make(self, clock):
+        return AdaptiveScheduler(
+            600, min_interval=120, max_interval=3600, jitter=0, clock=clock
+        )
+
+    def test_hot_and_idle(self):
+        clock = Clock()
+        scheduler = self.make(clock)
+        assert scheduler.next_delay('1') == 600
+
+        scheduler.on_success('1', 1, {'hw': 'reviewing'})
+        assert scheduler.next_delay('1') == 120, (
+            'Проверьте, что работа на проверке опрашивается чаще'
+        )
+
+        scheduler.on_success('1', 1, {'hw': 'approved'})
+        clock.now += 2 * 3600
+        assert scheduler.next_delay('1') == 600
+
+        clock.now += 2 * 24 * 3600
+        assert scheduler.next_delay('1') == 3600, (
+            'Проверьте, что давно не менявшиеся работы опрашиваются реже'
+        )
+
+    def test_error_backoff(self):
+        scheduler = self.make(Clock())
+        delays = []
+        for _ in range(5):
+            scheduler.on_error('1')
+            delays.append(scheduler.next_delay('1'))
+        assert delays == [600, 1200, 2400, 3600, 3600]
+        scheduler.on_success('1')
+        assert scheduler.next_delay('1') == 600
+
+    def test_jitter_bounded(self):
+        scheduler = AdaptiveScheduler(600, jitter=0.1)
+        delays = [scheduler.next_delay('1') for _ in range(100)]
+        assert all(540 <= delay <= 660 for delay in delays)
+
+    def test_set_base(self):
+        scheduler = self.make(Clock())
+        scheduler.set_base(60)
+        assert scheduler.next_delay('1') == 60 and (
+            scheduler.min_interval == 60
+        ), 'Проверьте, что новый интервал применяется без перезапуска'
+        scheduler.set_base(600)
+        assert scheduler.min_interval == 120, (
+            'Проверьте, что границы интервала восстанавливаются'
+        )
+
+
+class TestDeadlineQueue:
+
+    def test_order_reschedule_cancel(self):
+        queue = DeadlineQueue()
+        queue.schedule('a', 30)
+        queue.schedule('b', 10)
+        queue.schedule('c', 20)
+        queue.schedule('a', 5)
+        queue.cancel('c')
+
+        assert queue.next_deadline() == 5
+        assert queue.pop_due(15) == ['a', 'b'], (
+            'Проверьте, что сроки извлекаются по порядку с учетом переноса'
+        )
+        assert queue.pop_due(100) == [], (
+            'Проверьте, что отмененный срок не извлекается'
+        )
+        assert len(queue) == 0 and queue.next_deadline() is None
+
+
+class TestPollTrigger:
+
+    def test_interrupt(self):
+        trigger = PollTrigger()
+        started = time.monotonic()
+        assert trigger.wait(0.01), 'По истечении срока опрос продолжается'
+        threading.Timer(0.05, trigger.poll_now).start()
+        assert trigger.wait(10), 'Запрос опроса не останавливает бота'
+        threading.Timer(0.05, trigger.stop).start()
+        assert not trigger.wait(10), 'После stop() ожидание возвращает False'
+        assert time.monotonic() - started < 5, (
+            'Ожидание должно прерываться без ожидания срока'
+        )
+
+    def test_reload(self):
+        trigger = PollTrigger()
+        assert not trigger.take_reload()
+        threading.Timer(0.05, trigger.reload).start()
+        assert trigger.wait(10), 'Запрос перечитывания прерывает ожидание'
+        assert trigger.take_reload(), (
+            'Проверьте, что после reload() настройки перечитываются'
+        )
+        assert not trigger.take_reload(), (
+            'Проверьте, что запрос перечитывания снимается'
+        )
@@ -0,0 +1,46 @@
+from collections import Counter
+
+from sharding import HashRing, assign, node_tenants
+from tenants import Tenant
+
+KEYS = [str(index) for index in range(10000)]
+
+
+class TestHashRing:
+
+    def test_balance(self):
+        ring = HashRing(['w0', 'w1', 'w2', 'w3'])
+        counts = Counter(ring.node_for(key) for key in KEYS)
+        assert set(counts) == {'w0', 'w1', 'w2', 'w3'}
+        assert max(counts.values()) < 1.5 * len(KEYS) / 4, (
+            'Ключи должны распределяться по узлам примерно поровну'
+        )
+
+    def test_minimal_movement(self):
+        ring = HashRing(['w0', 'w1', 'w2'])
+        before = {key: ring.node_for(key) for key in KEYS}
+        ring.add('w3')
+        after = {key: ring.node_for(key) for key in KEYS}
+        moved = [key for key in KEYS if before[key] != after[key]]
+        assert all(after[key] == 'w3' for key in moved), (
+            'При добавлении узла ключи должны переезжать только на него'
+        )
+        assert len(moved) < len(KEYS) / 2
+        ring.remove('w3')
+        assert {key: ring.node_for(key) for key in KEYS} == before
+        assert HashRing().node_for('1') is None
+
+    def test_assign_partitions_tenants(self):
+        tenants = [Tenant(f'token{index}', index) for index in range(1, 200)]
+        members = ['w0', 'w1', 'w2']
+        shards = [assign(tenants, members, name) for name in members]
+        assigned = [tenant.tenant_id for shard in shards for tenant in shard]
+        assert sorted(assigned) == sorted(t.tenant_id for t in tenants), (
+            'Каждый студент должен достаться ровно одному процессу'
+        )
+        nodes = [node_tenants(tenants, index, 2) for index in range(2)]
+        assert len(nodes[0]) + len(nodes[1]) == len(tenants)
+        assert not {t.tenant_id for t in nodes[0]} & {
+            t.tenant_id for t in nodes[1]
+        }
+        assert node_tenants(tenants, 0, 1) == tenants
@@ -0,0 +1,39 @@
+from state import StateStore, homework_key
+
+
+class TestStateStore:
+
+    def test_state_survives_restart(self, tmp_path):
+        db_path = tmp_path / 'state.db'
+        store = StateStore(db_path, batch_size=100)
+        store.set_watermark('1', 1000)
+        store.set_status('1', 'hw', 'reviewing')
+        store.close()
+
+        store = StateStore(db_path)
+        assert store.get_watermark('1') == 1000, (
+            'Проверьте, что отметка времени сохраняется между запусками'
+        )
+        assert store.get_status('1', 'hw') == 'reviewing', (
+            'Проверьте, что статус работы сохраняется между запусками'
+        )
+        store.close()
+
+    def test_batched_writes(self, tmp_path):
+        db_path = tmp_path / 'state.db'
+        store = StateStore(db_path, batch_size=3)
+        store.set_watermark('1', 1)
+        store.set_watermark('1', 2)
+        assert len(store.pending_watermarks) == 1, (
+            'Проверьте, что повторная запись одного ключа не растит пачку'
+        )
+        store.set_status('1', 'a', 'approved')
+        store.set_status('1', 'b', 'approved')
+        assert not store.pending_statuses, (
+            'Проверьте, что пачка записывается при достижении размера'
+        )
+        assert StateStore(db_path).get_watermark('1') == 2
+
+    def test_homework_key(self):
+        assert homework_key({'id': 7, 'homework_name': 'hw'}) == '7'
+        assert homework_key({'homework_name': 'hw'}) == 'hw'
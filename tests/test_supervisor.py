@@ -0,0 +1,101 @@
+from supervisor import Supervisor
+
+
+class MockConnection:
+
+    def __init__(self, events, name):
+        self.events = events
+        self.name = name
+
+    def send(self, members):
+        self.events.append(('send', self.name, tuple(members)))
+
+    def poll(self, timeout=None):
+        return True
+
+    def recv(self):
+        return self.name
+
+    def close(self):
+        pass
+
+
+class MockProcess:
+
+    def __init__(self, events, target=None, args=(), name=None):
+        self.events = events
+        self.worker, self.members, self.child = args
+        self.alive = False
+        self.exitcode = None
+
+    def start(self):
+        self.alive = True
+        self.child.name = self.worker
+        self.events.append(('start', self.worker, tuple(self.members)))
+
+    def terminate(self):
+        self.alive = False
+        self.events.append(('stop', self.worker))
+
+    def is_alive(self):
+        return self.alive
+
+    def join(self, timeout=None):
+        pass
+
+
+class MockContext:
+
+    def __init__(self):
+        self.events = []
+
+    def Pipe(self):
+        connection = MockConnection(self.events, None)
+        return connection, connection
+
+    def Process(self, **kwargs):
+        return MockProcess(self.events, **kwargs)
+
+
+def make_supervisor(size):
+    context = MockContext()
+    supervisor = Supervisor(size, context=context)
+    supervisor.members = [f'w{number}' for number in range(size)]
+    for name in supervisor.members:
+        supervisor.start(name)
+    context.events.clear()
+    return supervisor, context.events
+
+
+class TestSupervisor:
+
+    def test_grow_waits_for_existing(self):
+        supervisor, events = make_supervisor(2)
+        supervisor.resize(1)
+        supervisor.step()
+        members = ('w0', 'w1', 'w2')
+        assert events == [
+            ('send', 'w0', members), ('send', 'w1', members),
+            ('start', 'w2', members),
+        ], (
+            'Новый процесс должен запускаться после того, как остальные '
+            'отдали его студентов'
+        )
+
+    def test_shrink_stops_first(self):
+        supervisor, events = make_supervisor(3)
+        supervisor.resize(-1)
+        supervisor.step()
+        members = ('w0', 'w1')
+        assert events == [
+            ('stop', 'w2'), ('send', 'w0', members), ('send', 'w1', members),
+        ], (
+            'Остальные процессы должны забирать студентов только после '
+            'остановки удаленного'
+        )
+
+    def test_restart_dead(self):
+        supervisor, events = make_supervisor(2)
+        supervisor.workers['w1'][0].alive = False
+        supervisor.step()
+        assert events == [('start', 'w1', ('w0', 'w1'))]
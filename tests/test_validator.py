@@ -0,0 +1,60 @@
+import pytest
+
+import homework
+from exceptions import (ResponseEmptyHW, ResponseMissingHW,
+                        ResponseMissingKeysVal, StatusUnknown)
+from validator import ResponseValidator
+
+
+def make_homework(**fields):
+    homework = {'id': 1, 'homework_name': 'hw', 'status': 'approved',
+                'reviewer_comment': 'Отлично',
+                'date_updated': '2022-01-01T00:00:00Z'}
+    homework.update(fields)
+    return homework
+
+
+class TestValidator:
+
+    validator = ResponseValidator(homework.HOMEWORK_STATUSES)
+
+    @pytest.mark.parametrize('response, exception', [
+        ([], TypeError),
+        ({}, ResponseMissingHW),
+        ({'homeworks': {}}, TypeError),
+        ({'homeworks': []}, ResponseEmptyHW),
+    ])
+    def test_response_errors(self, response, exception):
+        with pytest.raises(exception):
+            homework.check_response(response)
+        with pytest.raises(exception):
+            self.validator.validate(response)
+
+    @pytest.mark.parametrize('item, exception', [
+        ({'status': 'approved'}, KeyError),
+        (make_homework(homework_name=''), ResponseMissingKeysVal),
+        (make_homework(status='unknown'), StatusUnknown),
+    ])
+    def test_homework_errors(self, item, exception):
+        with pytest.raises(exception):
+            homework.parse_status(item)
+        with pytest.raises(exception):
+            self.validator.validate({'homeworks': [item]})
+
+    def test_records(self):
+        records = self.validator.validate({'homeworks': [
+            make_homework(), make_homework(id=2, status='rejected'),
+        ]})
+        assert records == [
+            {'id': 1, 'homework_name': 'hw', 'status': 'approved',
+             'date_updated': '2022-01-01T00:00:00Z'},
+            {'id': 2, 'homework_name': 'hw', 'status': 'rejected',
+             'date_updated': '2022-01-01T00:00:00Z'},
+        ], 'Валидатор должен возвращать компактные записи работ'
+
+    def test_message(self):
+        item = make_homework(status='rejected')
+        record = self.validator.validate({'homeworks': [item]})[0]
+        assert self.validator.message(record) == homework.parse_status(
+            item
+        ), 'Текст сообщения должен совпадать с parse_status()'
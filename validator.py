@@ -0,0 +1,69 @@
+import logging
+
+from exceptions import (ResponseEmptyHW, ResponseMissingHW,
+                        ResponseMissingKeysVal, StatusUnknown)
+
+logger = logging.getLogger('hw_bot')
+
+MESSAGE_TEMPLATE = 'Изменился статус проверки работы "{}". {}'
+
+
+def fail(exception, message):
+    """Запись ошибки в лог и выброс исключения."""
+    logger.error(message)
+    raise exception(message)
+
+
+class ResponseValidator:
+    """Проверка ответа API за один проход по работам.
+
+    Заменяет связку check_response() и parse_status(): каждая работа
+    проверяется и сразу сокращается до компактной записи с полями id,
+    homework_name, status и date_updated. Исключения те же, что у
+    check_response() и parse_status().
+    """
+
+    def __init__(self, statuses):
+        self.verdicts = dict(statuses)
+
+    def validate(self, response):
+        """Проверка ответа и список компактных записей работ."""
+        if not isinstance(response, dict):
+            fail(TypeError, 'Ответ не является словарем!')
+        if 'homeworks' not in response:
+            fail(ResponseMissingHW, 'В ответе отсутствует ключ homeworks')
+        homeworks = response['homeworks']
+        if not isinstance(homeworks, list):
+            fail(TypeError, 'Домашние работы не являются списком!')
+        if not homeworks:
+            fail(ResponseEmptyHW, 'Список работ пуст!')
+
+        verdicts = self.verdicts
+        records = []
+        append = records.append
+        for homework in homeworks:
+            try:
+                name = homework['homework_name']
+                status = homework['status']
+            except (KeyError, TypeError):
+                fail(KeyError,
+                     'В ответе отсутствует ключ homework_name или status')
+            if not name or not status:
+                fail(ResponseMissingKeysVal,
+                     'В ответе пуст ключ homework_name или status')
+            if status not in verdicts:
+                fail(StatusUnknown,
+                     'Статус с таким обозначением не найден в словаре')
+            append({
+                'id': homework.get('id'),
+                'homework_name': name,
+                'status': status,
+                'date_updated': homework.get('date_updated', ''),
+            })
+        return records
+
+    def message(self, record):
+        """Текст сообщения для проверенной записи."""
+        return MESSAGE_TEMPLATE.format(
+            record['homework_name'], self.verdicts[record['status']]
+        )